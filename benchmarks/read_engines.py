@@ -0,0 +1,58 @@
+"""
+Compares the fetch engines of ``fiber.database.read_with_progress`` on the
+data query of a condition, by wall-clock time and peak Python memory.
+
+Usage:
+    FIBER_DB_TYPE=hana python benchmarks/read_engines.py --limit 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from fiber import config
+from fiber.condition import VitalSign
+from fiber.database import get_connection, read_with_progress
+
+
+def run(engine: str, statement, repeat: int):
+    config.READ_ENGINE = engine
+    timings = []
+    for _ in range(repeat):
+        start = time.time()
+        result = read_with_progress(statement, get_connection(), silent=True)
+        timings.append(time.time() - start)
+
+    # Tracing slows down allocations, so memory is measured separately
+    tracemalloc.start()
+    read_with_progress(statement, get_connection(), silent=True)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, min(timings), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--limit', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    statement = VitalSign()._data_query(limit=args.limit).statement
+
+    results = {}
+    for engine in ('pandas', 'columnar'):
+        result, seconds, peak = run(engine, statement, args.repeat)
+        results[engine] = result
+        print(
+            f'{engine:>8}: {seconds:.2f}s, peak {peak / 2 ** 20:.1f} MiB, '
+            f'{len(result)} rows, '
+            f'{result.memory_usage(deep=True).sum() / 2 ** 20:.1f} MiB result'
+        )
+
+    assert (
+        results['pandas'].dtypes.equals(results['columnar'].dtypes)
+    ), 'Engines returned different dtypes'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+In-memory caches of condition results. ``mrn_cache`` holds the MRN sets of
+``.get_mrns()``, ``data_cache`` the DataFrames of ``.get_data()`` and
+``.get_occurrences()``. Both evict least recently used entries once their
+budget, ``FIBER_MRN_CACHE_MB`` and ``FIBER_DATA_CACHE_MB``, is exceeded.
+Requests for a subset of cached MRNs are derived from the cached superset,
+see ``fiber.cache.subsets``. Optionally, results are persisted across
+sessions, see ``fiber.cache.disk``.
+"""
+from typing import Optional
+
+import pandas as pd
+
+from fiber import config
+from fiber.cache import disk
+from fiber.cache.lru import LRUCache, sizeof
+from fiber.cache.registry import CacheRegistry
+from fiber.cache.subsets import RequestIndex
+
+mrn_cache = LRUCache(config.MRN_CACHE_BYTES)
+data_cache = LRUCache(config.DATA_CACHE_BYTES)
+request_index = RequestIndex()
+registry = CacheRegistry()
+mrn_cache.on_evict(request_index.discard)
+mrn_cache.on_evict(registry.discard)
+data_cache.on_evict(request_index.discard)
+data_cache.on_evict(registry.discard)
+
+
+def clear(persistent: bool = False):
+    """
+    Removes all cached MRNs and data.
+
+    Args:
+        persistent: whether to remove the results stored on disk as well
+    """
+    mrn_cache.clear()
+    data_cache.clear()
+    request_index.clear()
+    registry.clear()
+    if persistent:
+        disk.clear()
+
+
+def invalidate(condition, persistent: bool = False):
+    """
+    Evicts all cached results of a condition, including those of combined
+    OR/AND conditions it is part of.
+
+    Args:
+        condition: the condition whose results should be fetched again
+        persistent: whether to remove its results stored on disk as well
+    """
+    keys = registry.keys_of(condition)
+    for key in keys:
+        for cache in (mrn_cache, data_cache):
+            try:
+                del cache[key]
+            except KeyError:
+                pass
+    if persistent:
+        # Stored results are keyed by the fingerprint of the requested
+        # condition, i.e. the condition itself or a combined parent
+        owners = registry.owners_of(keys) | {condition.fingerprint}
+        for fingerprint in owners:
+            disk.remove(fingerprint)
+    for key in keys:
+        request_index.discard(key)
+        registry.discard(key)
+
+
+def stats() -> pd.DataFrame:
+    """
+    Returns the cache statistics per condition class: hits (including
+    derived subsets and results loaded from disk), misses, the number and
+    bytes of cached entries, and the seconds saved by in-memory hits.
+
+    Example:
+
+    >>> fiber.cache.stats()
+               hits  misses  hit_ratio  entries   bytes  saved_seconds
+    condition
+    Diagnosis     3       2        0.6        2  124096          1.931
+    """
+    return registry.stats()
+
+
+def resize(
+    data_bytes: Optional[int] = None,
+    mrn_bytes: Optional[int] = None,
+):
+    """
+    Changes the memory budgets of the caches. Shrinking a cache evicts its
+    least recently used entries right away.
+
+    Args:
+        data_bytes: new budget of the data cache in bytes
+        mrn_bytes: new budget of the MRN cache in bytes
+    """
+    if data_bytes is not None:
+        data_cache.resize(data_bytes)
+    if mrn_bytes is not None:
+        mrn_cache.resize(mrn_bytes)
+
+
+__all__ = [
+    'CacheRegistry',
+    'clear',
+    'data_cache',
+    'disk',
+    'invalidate',
+    'LRUCache',
+    'mrn_cache',
+    'registry',
+    'request_index',
+    'RequestIndex',
+    'resize',
+    'sizeof',
+    'stats',
+]
@@ -0,0 +1,174 @@
+"""
+Persistent tier of the condition caches. Results are stored as parquet files
+in ``FIBER_DISK_CACHE_DIR``, so they survive restarts of a notebook or batch
+job. The tier is disabled if no directory is configured.
+
+Entries expire after ``FIBER_DISK_CACHE_TTL_HOURS``. Additionally, the result
+of the ``FIBER_DISK_CACHE_WATERMARK`` query, e.g. ``SELECT MAX(FACT_KEY) FROM
+FACT``, is part of every key, so all entries are invalidated once the
+warehouse was reloaded. The query is repeated after
+``FIBER_DISK_CACHE_WATERMARK_MINUTES``, so long-running sessions notice a
+reload as well.
+"""
+import glob
+import os
+import threading
+import time
+from typing import Any, Optional
+
+import pandas as pd
+
+from fiber import config
+from fiber.utils.fingerprint import digest, MRNSet
+
+# Column under which MRN sets are stored
+MRN_SET_COLUMN = '__mrns__'
+
+# Result of the watermark query and when it was executed
+_watermark = None
+_watermark_checked_at = 0.0
+_watermark_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(config.DISK_CACHE_DIR)
+
+
+def _database_identity() -> str:
+    if config.DB_TYPE == 'test':
+        return config.DATABASE_URI
+    return (
+        f'{config.DB_TYPE}://{config.DB_USER}@'
+        f'{config.DB_HOST}:{config.DB_PORT}/{config.DB_SCHEMA}'
+    )
+
+
+def _watermark_expired() -> bool:
+    age_in_minutes = (time.time() - _watermark_checked_at) / 60
+    return (
+        _watermark is None
+        or age_in_minutes > config.DISK_CACHE_WATERMARK_MINUTES
+    )
+
+
+def watermark() -> Optional[str]:
+    """
+    Returns the result of the watermark query, which is executed again once
+    it is older than ``FIBER_DISK_CACHE_WATERMARK_MINUTES``.
+    """
+    global _watermark, _watermark_checked_at
+    if not config.DISK_CACHE_WATERMARK:
+        return None
+    if _watermark_expired():
+        with _watermark_lock:
+            if _watermark_expired():
+                from fiber.database import get_connection
+                _watermark = str(get_connection().execute(
+                    config.DISK_CACHE_WATERMARK).scalar())
+                _watermark_checked_at = time.time()
+    return _watermark
+
+
+def reset_watermark():
+    """Executes the watermark query again on the next request."""
+    global _watermark
+    _watermark = None
+
+
+def request_key(condition, method: str, arguments: dict) -> str:
+    """
+    Key of a condition request on disk. Entries are grouped by the
+    fingerprint of the condition, so they can be removed per condition.
+
+    Args:
+        condition: the requested condition
+        method: name of the request, e.g. ``get_data``
+        arguments: arguments of the request, like included MRNs and limit,
+            other arguments are only passed if they differ from their
+            defaults
+    """
+    included_mrns = arguments.get('included_mrns')
+    other_arguments = {
+        name: value for name, value in arguments.items()
+        if name not in ('included_mrns', 'limit')
+    }
+    return condition.fingerprint + '/' + digest({
+        'database': _database_identity(),
+        'watermark': watermark(),
+        'condition': condition.fingerprint,
+        'method': method,
+        'included_mrns': (
+            MRNSet.of(included_mrns).fingerprint if included_mrns else None
+        ),
+        'limit': arguments.get('limit'),
+        **({'arguments': other_arguments} if other_arguments else {}),
+    })
+
+
+def _path(key: str) -> str:
+    return os.path.join(config.DISK_CACHE_DIR, key[:2], f'{key}.parquet')
+
+
+def remove(fingerprint: str):
+    """Removes all stored results of the condition with ``fingerprint``."""
+    if not enabled():
+        return
+    for path in glob.glob(_path(fingerprint + '/*')):
+        os.remove(path)
+
+
+def load(key: str) -> Optional[Any]:
+    """
+    Returns the stored result for ``key`` or None if there is none or it is
+    expired.
+    """
+    path = _path(key)
+    try:
+        age_in_hours = (time.time() - os.path.getmtime(path)) / 3600
+    except OSError:
+        return None
+    if age_in_hours > config.DISK_CACHE_TTL_HOURS:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    # Parquet keeps the dtypes, so frames are returned as they were stored,
+    # i.e. after they were formatted by the condition
+    df = pd.read_parquet(path)
+    if list(df.columns) == [MRN_SET_COLUMN]:
+        return set(df[MRN_SET_COLUMN])
+    return df
+
+
+def store(key: str, value: Any):
+    """
+    Stores a DataFrame or MRN set under ``key``. Results that can not be
+    written as parquet, e.g. due to mixed types, are skipped.
+    """
+    if isinstance(value, (set, frozenset)):
+        value = pd.DataFrame({MRN_SET_COLUMN: sorted(value)})
+    if not isinstance(value, pd.DataFrame):
+        return
+
+    path = _path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary file first, so readers never see partial files
+    temporary_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        value.to_parquet(temporary_path)
+        os.replace(temporary_path, path)
+    except (OSError, ValueError, TypeError, NotImplementedError):
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def clear():
+    """Removes all stored results and resets the watermark."""
+    reset_watermark()
+    if not enabled():
+        return
+    pattern = os.path.join(config.DISK_CACHE_DIR, '*', '*', '*.parquet')
+    for path in glob.glob(pattern):
+        os.remove(path)
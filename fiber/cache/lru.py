@@ -0,0 +1,109 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+import pandas as pd
+
+
+def sizeof(value: Any) -> int:
+    """
+    Approximates the memory used by a cached value in bytes. DataFrames are
+    measured including the contents of object columns, sets including their
+    elements.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (set, frozenset)):
+        return sys.getsizeof(value) + sum(map(sys.getsizeof, value))
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Thread-safe mapping that holds at most ``max_bytes`` of values, as
+    measured by ``sizeof``. When the budget is exceeded, the least recently
+    used entries are evicted. Values larger than the whole budget are not
+    cached at all. Callbacks registered with ``.on_evict()`` are called with
+    the key of each evicted entry, e.g. to drop what is known about it.
+
+    Args:
+        max_bytes: memory budget of the cache in bytes
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def __getitem__(self, key: Hashable):
+        with self._lock:
+            value = self._data[key]
+            self._data.move_to_end(key)
+            return value
+
+    def get(self, key: Hashable, default: Any = None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key: Hashable, value: Any):
+        size = sizeof(value)
+        with self._lock:
+            if key in self._data:
+                del self[key]
+            if size > self.max_bytes:
+                return
+            self._data[key] = value
+            self._sizes[key] = size
+            self.current_bytes += size
+            self._evict()
+
+    def __delitem__(self, key: Hashable):
+        with self._lock:
+            del self._data[key]
+            self.current_bytes -= self._sizes.pop(key)
+
+    def __contains__(self, key: Hashable):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def size_of(self, key: Hashable) -> Optional[int]:
+        """Returns the size of a cached value in bytes, None if not cached."""
+        return self._sizes.get(key)
+
+    def on_evict(self, callback: Callable[[Hashable], Any]):
+        """Registers ``callback(key)`` to be called for evicted entries."""
+        self._listeners.append(callback)
+
+    def _evict(self):
+        while self.current_bytes > self.max_bytes:
+            key, _ = self._data.popitem(last=False)
+            self.current_bytes -= self._sizes.pop(key)
+            for callback in self._listeners:
+                callback(key)
+
+    def resize(self, max_bytes: int):
+        """Changes the budget, evicting entries if it shrinks."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.current_bytes = 0
+
+    def __repr__(self):
+        return (
+            f'LRUCache({len(self)} entries, '
+            f'{self.current_bytes / 2 ** 20:.1f}/'
+            f'{self.max_bytes / 2 ** 20:.1f} MiB)'
+        )
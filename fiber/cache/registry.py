@@ -0,0 +1,138 @@
+import threading
+from collections import defaultdict
+from typing import Hashable, Iterator, List, Set
+
+import pandas as pd
+
+from fiber.cache.lru import LRUCache
+
+STATS_COLUMNS = [
+    'hits',
+    'misses',
+    'hit_ratio',
+    'entries',
+    'bytes',
+    'saved_seconds',
+]
+
+
+def lineage(condition) -> Iterator[str]:
+    """Yields the fingerprints of a condition and all of its descendants."""
+    yield condition.fingerprint
+    for child in getattr(condition, 'children', None) or []:
+        yield from lineage(child)
+
+
+class CacheRegistry:
+    """
+    Keeps track of the cached keys of each condition, what it cost to fetch
+    them, and of the hits and misses per condition class.
+
+    Keys are registered under the fingerprints of the requested condition and
+    of all conditions it was combined from, so invalidating a condition also
+    invalidates results of its combined OR/AND parents. Evicted keys should
+    be dropped with ``.discard()``.
+    """
+
+    def __init__(self):
+        self._keys = defaultdict(set)
+        self._entries = {}
+        self._owners = {}
+        self._lineages = {}
+        self._counts = defaultdict(lambda: defaultdict(float))
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        condition,
+        key: Hashable,
+        cache: LRUCache,
+        seconds: float,
+    ):
+        """Registers a freshly fetched result and its cost."""
+        with self._lock:
+            self._entries[key] = (
+                condition.__class__.__name__, cache, seconds)
+            self._owners[key] = condition.fingerprint
+            self._lineages[key] = list(lineage(condition))
+            for fingerprint in self._lineages[key]:
+                self._keys[fingerprint].add(key)
+
+    def discard(self, key: Hashable):
+        """Forgets a key that was evicted or removed from its cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._owners.pop(key, None)
+            for fingerprint in self._lineages.pop(key, []):
+                keys = self._keys.get(fingerprint)
+                if keys is None:
+                    continue
+                keys.discard(key)
+                if not keys:
+                    del self._keys[fingerprint]
+
+    def cost(self, key: Hashable) -> float:
+        """Returns the seconds it took to fetch the result of ``key``."""
+        entry = self._entries.get(key)
+        return entry[2] if entry else 0.0
+
+    def count(self, condition, hit: bool, saved_seconds: float = 0.0):
+        with self._lock:
+            counts = self._counts[condition.__class__.__name__]
+            counts['hits' if hit else 'misses'] += 1
+            counts['saved_seconds'] += saved_seconds
+
+    def keys_of(self, condition) -> List[Hashable]:
+        """Returns the keys registered under the fingerprint of condition."""
+        with self._lock:
+            return list(self._keys.pop(condition.fingerprint, set()))
+
+    def owners_of(self, keys: List[Hashable]) -> Set[str]:
+        """
+        Returns the fingerprints of the conditions that requested ``keys``,
+        e.g. those of the combined parents of a condition.
+        """
+        with self._lock:
+            return {
+                self._owners.pop(key) for key in keys if key in self._owners
+            }
+
+    def stats(self) -> pd.DataFrame:
+        """
+        Returns hits, misses, cached entries and bytes and the time saved by
+        hits per condition class.
+        """
+        with self._lock:
+            rows = defaultdict(lambda: defaultdict(float))
+            for name, counts in self._counts.items():
+                rows[name].update(counts)
+            for key, (name, cache, _) in list(self._entries.items()):
+                size = cache.size_of(key)
+                if size is None:
+                    # Evicted in the meantime
+                    del self._entries[key]
+                    continue
+                rows[name]['entries'] += 1
+                rows[name]['bytes'] += size
+
+        df = pd.DataFrame.from_dict(
+            {name: dict(values) for name, values in rows.items()},
+            orient='index',
+        ).reindex(columns=STATS_COLUMNS).fillna(0)
+        requests = df.hits + df.misses
+        df['hit_ratio'] = df.hits / requests.where(requests > 0)
+        df.index.name = 'condition'
+        return df.astype({
+            'hits': int,
+            'misses': int,
+            'entries': int,
+            'bytes': int,
+        }).sort_index()
+
+    def clear(self):
+        with self._lock:
+            self._keys.clear()
+            self._entries.clear()
+            self._owners.clear()
+            self._lineages.clear()
+            self._counts.clear()
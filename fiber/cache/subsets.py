@@ -0,0 +1,80 @@
+import threading
+from collections import defaultdict
+from typing import FrozenSet, Hashable, Optional
+
+from fiber.cache.lru import LRUCache
+
+
+class RequestIndex:
+    """
+    Remembers the included MRNs and limit of each cached request, grouped by
+    condition and request name. This allows to answer a request from a cached
+    result that covers a superset of its MRNs.
+
+    Requests of evicted results should be dropped with ``.discard()``, so the
+    included MRNs are not kept alive beyond the budget of the cache.
+    """
+
+    def __init__(self):
+        self._requests = defaultdict(dict)
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        group: Hashable,
+        key: Hashable,
+        included_mrns: Optional[FrozenSet[str]],
+        limit: Optional[int],
+    ):
+        with self._lock:
+            self._requests[group][key] = (included_mrns, limit)
+            self._groups[key] = group
+
+    def discard(self, key: Hashable):
+        """Drops the request of a result that is no longer cached."""
+        with self._lock:
+            group = self._groups.pop(key, None)
+            if group is None:
+                return
+            requests = self._requests[group]
+            requests.pop(key, None)
+            if not requests:
+                del self._requests[group]
+
+    def covering(
+        self,
+        group: Hashable,
+        included_mrns: Optional[FrozenSet[str]],
+        cache: LRUCache,
+    ) -> Optional[Hashable]:
+        """
+        Returns the key of the smallest cached result in ``group`` that was
+        fetched without limit, for all MRNs or a superset of
+        ``included_mrns``. Requests of results removed otherwise, e.g. by
+        ``fiber.cache.invalidate()``, are dropped.
+        """
+        best_key, best_size = None, None
+        with self._lock:
+            requests = self._requests.get(group, {})
+            for key, (mrns, limit) in list(requests.items()):
+                if key not in cache:
+                    del requests[key]
+                    self._groups.pop(key, None)
+                    continue
+                if limit is not None:
+                    continue
+                if mrns is None:
+                    size = float('inf')
+                elif included_mrns is not None and included_mrns <= mrns:
+                    size = len(mrns)
+                else:
+                    continue
+                if best_size is None or size < best_size:
+                    best_key, best_size = key, size
+        return best_key
+
+    def clear(self):
+        with self._lock:
+            self._requests.clear()
+            self._groups.clear()
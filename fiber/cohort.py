@@ -3,33 +3,50 @@ import math
 import time
 from collections import defaultdict
 from functools import reduce
-from typing import List, Optional, Set, Tuple, Union
+from typing import Callable, Iterator, List, Optional, Set, Tuple, Union
 
 import pandas as pd
 
 import fiber
 from fiber.condition import (
     _DatabaseCondition,
-    MRNs,
     Patient,
 )
 from fiber.condition.base import _BaseCondition
+from fiber.condition.database import prefetch_data
 from fiber.config import OCCURRENCE_INDEX
+from fiber.database import READ_CHUNK_SIZE
+from fiber.database.sampling import partition_mrns
 from fiber.dataframe import (
     aggregate_df_with_windows,
-    column_threshold_clip,
+    ChunkedPivot,
     create_id_column,
     merge_event_dfs,
     merge_to_base,
+    pivot_values,
     time_window_clip
 )
+from fiber.dataframe.sparse import (
+    aggregate_cells,
+    hstack as sparse_hstack,
+    pivot_sparse,
+    SPARSE_FORMATS,
+    SparsePivot,
+)
 from fiber.extensions import DEFAULT_PIVOT_CONFIG
 from fiber.plots.distributions import (
     bars,
     hist,
 )
 from fiber.storage.json import dict_to_condition
-from fiber.utils import Timer
+from fiber.utils import (
+    get_process_executor,
+    MRNSet,
+    process_call,
+    thread_map,
+    Timer,
+    tqdm,
+)
 
 
 class Cohort:
@@ -47,6 +64,13 @@ class Cohort:
     Args:
         condition: The condition that defines Cohort belonging.
         limit: The maximum number of Patients that the Cohort should hold.
+        sample: The fraction of Patients to select by a deterministic hash of
+            their MRN, e.g. ``0.05`` to prototype on 5% of the Cohort. See
+            :meth:`fiber.condition.base._BaseCondition.get_mrns`.
+        seed: The seed of the sample.
+        partition: The index and number of partitions, if the Cohort only
+            holds one part of the Patients. See
+            :meth:`fiber.cohort.Cohort.partition`.
     """
 
     def __init__(
@@ -57,13 +81,20 @@ class Cohort:
         comment: Optional[str] = '',
         version: Optional[str] = '1',
         createdAt: Optional[float] = time.time(),
-        fiberVersion: Optional[str] = None
+        fiberVersion: Optional[str] = None,
+        sample: Optional[float] = None,
+        seed: Optional[int] = 0,
+        partition: Optional[Tuple[int, int]] = None,
     ):
         self.condition = condition
         self._excluded_mrns = set(excluded_mrns)
         self._mrn_limit = limit
+        self._sample = sample
+        self._seed = seed
+        self._partition = tuple(partition) if partition else None
         self._occurrences = None
         self._mrns = None
+        self._fingerprinted = None
         self.comment = comment
         self.version = version
         self.created_at = createdAt
@@ -73,11 +104,27 @@ class Cohort:
     def mrns(self) -> Set[str]:
         """Get the MRN of each individual Cohort member."""
         if self._mrns is None:
-            self._mrns = self.condition.get_mrns(
-                limit=self._mrn_limit
-            ) - self._excluded_mrns
+            self._mrns = set(self.condition.get_mrns(
+                limit=self._mrn_limit,
+                sample=self._sample,
+                seed=self._seed,
+            )) - self._excluded_mrns
+            if self._partition:
+                index, partitions = self._partition
+                self._mrns = partition_mrns(self._mrns, partitions)[index]
         return self._mrns
 
+    @property
+    def _mrn_set(self) -> MRNSet:
+        """
+        The MRNs of the Cohort as an MRNSet, whose fingerprint is computed
+        only once. A new one is created if ``.mrns`` was changed since.
+        """
+        mrns = self.mrns
+        if self._fingerprinted is None or self._fingerprinted != mrns:
+            self._fingerprinted = MRNSet(mrns)
+        return self._fingerprinted
+
     @property
     def occurrences(self) -> pd.DataFrame:
         """Get a dataframe of all cohort condition occurrences."""
@@ -98,28 +145,167 @@ class Cohort:
         self._mrns = None
         return self
 
+    def partition(self, partitions: int) -> List['Cohort']:
+        """Split the Cohort into disjoint parts by a stable hash of the MRNs.
+
+        Each part is a Cohort that fetches occurrences and data only for its
+        own Patients, so a large Cohort can be processed part by part with
+        bounded memory. See :meth:`fiber.cohort.Cohort.map_partitions`.
+        Parts without Patients are left out, as they would fetch the data of
+        all Patients, so fewer parts may be returned.
+
+        Args:
+            partitions: The number of parts.
+
+        Examples:
+            >>> for part in cohort.partition(8):
+            ...     part.values_for(LabValue()).to_csv('labs.csv', mode='a')
+        """
+        parts = []
+        for index, mrns in enumerate(partition_mrns(self.mrns, partitions)):
+            if not mrns:
+                continue
+            part = Cohort(
+                self.condition,
+                limit=self._mrn_limit,
+                excluded_mrns=self._excluded_mrns,
+                comment=self.comment,
+                version=self.version,
+                createdAt=self.created_at,
+                fiberVersion=self.fiber_version,
+                sample=self._sample,
+                seed=self._seed,
+                partition=(index, partitions),
+            )
+            part._mrns = mrns
+            if self._occurrences is not None:
+                part._occurrences = self._occurrences[
+                    self._occurrences.medical_record_number.isin(mrns)
+                ].reset_index(drop=True)
+            parts.append(part)
+        return parts
+
+    def map_partitions(
+        self,
+        func: Callable[['Cohort'], pd.DataFrame],
+        partitions: int,
+        parallel: bool = False,
+    ) -> pd.DataFrame:
+        """Apply a per-patient pipeline to each part of the Cohort.
+
+        The Cohort is split by :meth:`fiber.cohort.Cohort.partition` and the
+        results of the parts are concatenated. This is only correct for
+        results per Patient, e.g. of ``values_for`` followed by
+        ``aggregate_values_in``, but not for steps across Patients like the
+        threshold of ``pivot_all_for``.
+
+        Args:
+            func: The pipeline, called with each part.
+            partitions: The number of parts.
+            parallel: Whether to process the parts concurrently on up to
+                ``FIBER_MAX_WORKERS`` threads. Otherwise they are processed
+                one after another, which bounds memory to one part.
+
+        Examples:
+            >>> cohort.map_partitions(
+            ...     lambda part: part.aggregate_values_in(
+            ...         [(-30, 0)], part.values_for(LabValue()),
+            ...         {'numeric_value': 'mean'}),
+            ...     partitions=8,
+            ... )
+        """
+        results = thread_map(
+            func, self.partition(partitions), parallel=parallel)
+        if not results:
+            return pd.DataFrame()
+        return pd.concat(
+            results,
+            ignore_index=isinstance(results[0].index, pd.RangeIndex),
+            sort=False,
+        )
+
     def pivot_all_for(
         self,
         condition: _BaseCondition,
         pivot_table_kwargs: dict,
         threshold: Optional[float] = 0.5,
         window: Optional[Tuple[int]] = (-math.inf, math.inf),
-        flatten_columns: Optional[bool] = True
-    ) -> pd.DataFrame:
+        flatten_columns: Optional[bool] = True,
+        partitions: Optional[int] = None,
+        sparse: Optional[str] = None,
+    ) -> Union[pd.DataFrame, SparsePivot]:
         """Fetches data, aggregates and pivots while time clipping.
 
         Fetches data for conditions within time windows. Pivots the fetched
         data based on the provided aggregation functions and removes columns
-        that are filled below a threshold.
+        that are filled below a threshold. Pivoting runs on the process pool
+        if ``FIBER_MAX_PROCESSES`` is set, see
+        :func:`fiber.dataframe.pivot.pivot_values`.
         Additionally applies column renaming magic ✨.
 
+        With ``partitions``, the Cohort is processed part by part, see
+        :meth:`fiber.cohort.Cohort.partition`, and the parts are combined by
+        :class:`fiber.dataframe.pivot.ChunkedPivot`. The result is the same,
+        as the threshold applies to the fill rates of all parts, but peak
+        memory scales with the size of a part instead of with the Cohort.
+
+        With ``sparse``, values are aggregated in long format and pivoted
+        into a sparse matrix without a dense frame in between, see
+        :mod:`fiber.dataframe.sparse`. ``'csr'`` returns a
+        :class:`fiber.dataframe.sparse.SparsePivot` of a SciPy CSR matrix
+        with its row and column index, which can be passed to scikit-learn.
+        ``'pandas'`` returns a DataFrame of ``SparseDtype`` columns. Only the
+        ``columns`` and ``aggfunc`` of ``pivot_table_kwargs`` are supported.
+
         Args:
             condition: any condition can be used here
             pivot_table_kwargs: args that should be passed to pd.pivot_table
             threshold: columns must be filled above this threshold
             window: relevant time-window (inclusive interval)
             flatten_columns: should column names be flattened from tuples
+            partitions: number of parts to fetch and pivot one after another
+            sparse: ``'csr'`` or ``'pandas'`` to return a sparse result
         """
+        if sparse:
+            if sparse not in SPARSE_FORMATS:
+                raise ValueError(
+                    f'Sparse must be one of {SPARSE_FORMATS}, not {sparse}')
+            parts = self.partition(partitions) if partitions else [self]
+            pivot = pivot_sparse(
+                [
+                    aggregate_cells(
+                        part._values_to_pivot(condition, window),
+                        pivot_table_kwargs,
+                    )
+                    for part in parts
+                ],
+                pivot_table_kwargs,
+                threshold=threshold,
+                flatten_columns=flatten_columns,
+            )
+            return pivot if sparse == 'csr' else pivot.to_frame()
+
+        if partitions:
+            pivot = ChunkedPivot(pivot_table_kwargs)
+            for part in self.partition(partitions):
+                pivot.add(part._values_to_pivot(condition, window))
+            return pivot.result(
+                threshold=threshold, flatten_columns=flatten_columns)
+
+        return process_call(
+            pivot_values,
+            self._values_to_pivot(condition, window),
+            pivot_table_kwargs=pivot_table_kwargs,
+            threshold=threshold,
+            flatten_columns=flatten_columns,
+        )
+
+    def _values_to_pivot(
+        self,
+        condition: _BaseCondition,
+        window: Tuple[int],
+    ) -> pd.DataFrame:
+        """Time clipped values of a condition with id and index columns."""
         df = self.values_for(condition)
 
         with Timer('Time clipping'):
@@ -131,48 +317,51 @@ class Cohort:
         with Timer('Creating id columns'):
             create_id_column(condition, df)
 
-        with Timer('Pivoting'):
-            df = pd.pivot_table(
-                data=df,
-                index=OCCURRENCE_INDEX,
-                values=pivot_table_kwargs['aggfunc'].keys(),
-                **pivot_table_kwargs
-            )
-
-        with Timer('Column threshold clipping'):
-            df = column_threshold_clip(
-                df=df,
-                threshold=threshold
-            )
-
-        if flatten_columns:
-            with Timer('Flatten column index'):
-                df.columns = [
-                    '__'.join(col[1:]).strip()
-                    for col in df.columns.values
-                ]
-
         return df
 
     def get_pivoted_features(
         self,
         pivot_config: Optional[dict] = DEFAULT_PIVOT_CONFIG,
-    ):
+        sparse: Optional[str] = None,
+    ) -> Union[pd.DataFrame, SparsePivot]:
         """Gets all data as specified in the DEFAULT_PIVOT_CONFIG.
 
         This enables unsupervised machine learning and removes the need
         to specify sophisticated conditions. It can also help to see which
-        data are present in the database.
+        data are present in the database. The conditions are fetched
+        concurrently on up to ``FIBER_MAX_WORKERS`` threads and pivoted on up
+        to ``FIBER_MAX_PROCESSES`` processes, so the features are ready about
+        when the slowest condition is. Progress is reported per condition.
 
         Args:
             pivot_config: Mapping of conditions to arguments for
                 :meth:`fiber.cohort.Cohort.pivot_all_for`
+            sparse: ``'pandas'`` to merge sparse pivots with the Patient
+                data, or ``'csr'`` to return a
+                :class:`fiber.dataframe.sparse.SparsePivot` of the pivots
+                for all occurrences of the Cohort, without the Patient data.
 
         """
-        results = [
-            self.pivot_all_for(cond, **pivot_table_kwargs)
-            for (cond, pivot_table_kwargs) in pivot_config.items()
-        ]
+        # Shared by all conditions, so it is fetched once beforehand
+        self.occurrences
+        # Forks the pivoting processes before the fetching threads start
+        get_process_executor()
+
+        with tqdm(total=len(pivot_config), desc='Pivoting') as progress:
+            def pivot(item):
+                condition, kwargs = item
+                with Timer() as timer:
+                    df = self.pivot_all_for(condition, **kwargs, sparse=sparse)
+                progress.write(
+                    f'Pivoted {condition} in {timer.elapsed:.2f}s')
+                progress.update()
+                return df
+
+            results = thread_map(pivot, pivot_config.items())
+
+        if sparse == 'csr':
+            return sparse_hstack(results, pd.MultiIndex.from_frame(
+                self.occurrences[OCCURRENCE_INDEX]))
 
         with Timer('Merge'):
             return self.merge_patient_data(*results)
@@ -185,6 +374,11 @@ class Cohort:
     ) -> Union[pd.DataFrame, List[pd.DataFrame]]:
         """Fetch data for all members of the Cohort.
 
+        Conditions on the same base table and with the same dimensions are
+        combined into one query. The queries of different groups run
+        concurrently on up to ``FIBER_MAX_WORKERS`` threads, and results keep
+        the order of the conditions.
+
         Args:
             data_condition: A condition that describes data points.
             *args: Further data_conditions.
@@ -200,23 +394,107 @@ class Cohort:
         """
         data_conditions = [data_condition] + list(args)
 
-        data = []
-        # Group Data by BaseTable (:/ only works for DatabaseConditions)
+        # Group Data by BaseTable and dimensions, as only these are combined
+        # into one query (:/ only works for DatabaseConditions). Others, like
+        # MRNs or combinations with &, fetch their data on their own.
         database_cond = defaultdict(list)
         for cond in data_conditions:
             if isinstance(cond, _DatabaseCondition):
-                database_cond[cond.base_table].append(cond)
-            elif isinstance(cond, MRNs):
+                database_cond[
+                    (cond.base_table, frozenset(cond.dimensions))
+                ].append(cond)
+            else:
                 database_cond[hash(cond)].append(cond)
 
-        # Get data per BaseTable
-        for c in database_cond.values():
-            c = reduce(_DatabaseCondition.__or__, c)
-
+        groups = [
+            reduce(_DatabaseCondition.__or__, c)
+            for c in database_cond.values()
+        ]
+        for c in groups:
             print(f'Fetching data for {c}')
-            data.append(c.get_data(self.mrns, limit=limit))
+
+        # Get data per BaseTable, concurrently on the shared thread pool
+        mrns = self._mrn_set
+        data = thread_map(lambda c: c.get_data(mrns, limit=limit), groups)
         return data if len(data) > 1 else data[0]
 
+    def prefetch(self, *conditions: _BaseCondition):
+        """Fetch data of many conditions for all members of the Cohort at once.
+
+        Conditions of the same class and dimensions are fetched with one
+        combined query, and the queries of different groups run
+        concurrently. The results are split per condition and cached, so
+        following calls like ``values_for``, ``has_onset`` or
+        ``has_precondition`` for these conditions do not query the database.
+        Conditions whose data is cached already are skipped.
+
+        Args:
+            *conditions: the conditions to fetch data for
+
+        Examples:
+            >>> cohort.prefetch(*[Diagnosis(code, 'ICD-9') for code in codes])
+            >>> cohort.values_for(Diagnosis(codes[0], 'ICD-9'))
+        """
+        mrns = self._mrn_set
+        groups = defaultdict(list)
+        for cond in conditions:
+            if (
+                isinstance(cond, _DatabaseCondition)
+                and not cond.get_data.is_cached(cond, mrns)
+            ):
+                groups[(type(cond), frozenset(cond.dimensions))].append(cond)
+
+        groups = list(groups.values())
+        print(
+            f'Prefetching data for {sum(map(len, groups))} conditions '
+            f'in {len(groups)} queries'
+        )
+        thread_map(lambda group: prefetch_data(group, mrns), groups)
+        return self
+
+    def explain_plan(self, condition: _DatabaseCondition):
+        """Explain the query fetching data of a condition for the Cohort.
+
+        The query is not executed, but the Cohort MRNs are fetched to build
+        it. See :meth:`fiber.condition.database._DatabaseCondition.explain`.
+
+        Args:
+            condition: the condition whose data query should be explained
+
+        Examples:
+            >>> plan = cohort.explain_plan(LabValue())
+            >>> plan.estimated_rows, plan.message_size_ratio
+        """
+        return condition.explain(self._mrn_set)
+
+    def iter(
+            self,
+            data_condition: _BaseCondition,
+            limit: Optional[int] = None,
+            chunk_size: int = READ_CHUNK_SIZE,
+    ) -> Iterator[pd.DataFrame]:
+        """Stream data for all members of the Cohort in chunks.
+
+        In contrast to :meth:`fiber.cohort.Cohort.get` the data is neither
+        concatenated nor cached, so memory is bounded by the ``chunk_size``.
+
+        Args:
+            data_condition: A condition that describes data points.
+            limit: Limit for the number of returned data points.
+            chunk_size: Approximate number of rows per yielded DataFrame.
+
+        Examples:
+            >>> for chunk in cohort.iter(VitalSign()):
+            ...     chunk.to_csv('vital_signs.csv', mode='a')
+
+        """
+        if isinstance(data_condition, _DatabaseCondition):
+            print(f'Streaming data for {data_condition}')
+            yield from data_condition.iter_data(
+                self._mrn_set, limit=limit, chunk_size=chunk_size)
+        else:
+            yield data_condition.get_data(self._mrn_set, limit=limit)
+
     def get_occurrences(
         self,
         condition: _BaseCondition,
@@ -231,10 +509,8 @@ class Cohort:
             df containing the occurrences for the specified cohort with
             respective age_in_days-entries.
         """
-        # (TODO) Check if selection of distinct timestamp can be moved to db
-        # for DatabaseConditions
-        occurrences = self.get(condition)
-        return occurrences[OCCURRENCE_INDEX].drop_duplicates()
+        print(f'Fetching occurrences for {condition}')
+        return condition.get_occurrences(self._mrn_set)
 
     def _validate_and_get_event_df(
         self,
@@ -459,12 +735,14 @@ class Cohort:
                     target.code_column.name.lower(),
                     target.context_column.name.lower()
                 ]
+            # Codes and contexts may be categorical, of which only the
+            # observed combinations are grouped
             df = df.groupby([
                 'medical_record_number',
                 'age_in_days',
                 'time_delta_in_days',
                 *grouper
-            ]).agg({
+            ], observed=True).agg({
                 'numeric_value': aggregate_value_per_day_func
             }).reset_index()
         df.sort_values(
@@ -554,8 +832,21 @@ class Cohort:
         }
 
     def __len__(self):
-        """Amount of MRNs in this cohort """
-        return len(self.condition)
+        """
+        Amount of MRNs in this cohort. Unless the MRNs were fetched already,
+        some are excluded or the Cohort is sampled or partitioned, they are
+        counted on the database, see
+        :meth:`fiber.condition.base._BaseCondition.count`.
+        """
+        if (
+            self._mrns is not None
+            or self._excluded_mrns
+            or self._sample is not None
+            or self._partition
+        ):
+            return len(self.mrns)
+        count = self.condition.count()
+        return min(count, self._mrn_limit) if self._mrn_limit else count
 
     def __iter__(self):
         """Iterator object on basis of the MRNs of this cohort """
@@ -572,6 +863,9 @@ class Cohort:
             'condition': self.condition.to_dict(),
             'excluded_mrns': list(self._excluded_mrns),
             'limit': self._mrn_limit,
+            'sample': self._sample,
+            'seed': self._seed,
+            'partition': self._partition,
             'comment': comment or self.comment,
             'version': version or self.version,
             'createdAt': self.created_at or created_at,
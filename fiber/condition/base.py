@@ -1,22 +1,200 @@
-import json
-from typing import Any, List, Optional, Set
+import inspect
+import time
+from functools import reduce, wraps
+from operator import or_
+from typing import Any, Callable, List, Optional, Set
 
-from cachetools import cached
+import pandas as pd
+from sqlalchemy import sql
 
+from fiber import metrics
+from fiber.cache import (
+    data_cache,
+    disk,
+    LRUCache,
+    mrn_cache,
+    registry,
+    request_index,
+)
+from fiber.config import OCCURRENCE_INDEX
+from fiber.database import get_connection, read_with_progress
+from fiber.database.dtypes import apply_declared_dtypes
+from fiber.database.sampling import in_sample, sample_mrns
+from fiber.utils.fingerprint import digest, MRNSet
 
-# They can get very large (implement own version of Cachetools Cache)
-mrn_cache = {}
-data_cache = {}
+MRN_COLUMN = OCCURRENCE_INDEX[0]
 
 
 def _hash_request(instance: Any,
                   included_mrns: Optional[Set] = None,
                   limit: Optional[int] = None):
-    return hash(
-        str(hash(instance)) +
-        str(hash(frozenset(included_mrns or []))) +
-        str(limit)
-    )
+    mrns = MRNSet.of(included_mrns).fingerprint if included_mrns else None
+    return f'{instance.fingerprint}/{mrns}/{limit}'
+
+
+def _hash_mrn_request(instance: Any,
+                      limit: Optional[int] = None,
+                      sample: Optional[float] = None,
+                      seed: int = 0):
+    key = 'mrns/' + _hash_request(instance, limit=limit)
+    return key if sample is None else f'{key}/{sample}/{seed}'
+
+
+def _hash_count_request(instance: Any):
+    return 'count/' + _hash_request(instance)
+
+
+def _hash_occurrence_request(instance: Any,
+                             included_mrns: Optional[Set] = None,
+                             limit: Optional[int] = None):
+    return 'occurrences/' + _hash_request(instance, included_mrns, limit)
+
+
+_MISSING = object()
+
+
+def _filter_data(df, included_mrns):
+    """Restricts a cached DataFrame to the requested MRNs."""
+    if included_mrns is None:
+        return df
+    if MRN_COLUMN not in df.columns:
+        return _MISSING
+    df = df[df[MRN_COLUMN].isin(list(included_mrns))]
+    return df.reset_index(drop=True)
+
+
+def _limit_mrns(mrns, included_mrns, limit):
+    """Restricts MRNs that were evaluated locally to the requested limit."""
+    return set(sorted(mrns)[:limit])
+
+
+def cached(cache: LRUCache, key: Callable, derive: Optional[Callable] = None):
+    """
+    Caches the results of a condition request like ``.get_data()`` in
+    ``cache`` under ``key(self, **arguments)``.
+
+    Results of requests without limit that are missing in memory are
+    derived, if possible, by ``derive(result, included_mrns)`` from a cached
+    result of the same condition that was fetched without limit for a
+    superset of the requested MRNs or for all of them, and with the same
+    other arguments. Limited requests are always fetched, as the database
+    picks the rows within the limit. Otherwise they are looked up on disk,
+    if ``fiber.cache.disk`` is enabled, before they are fetched. Every call,
+    including cache hits, is recorded in ``fiber.metrics`` and in the
+    statistics of ``fiber.cache.stats()``.
+
+    The decorated request provides ``.is_cached(self, ...)`` to check for a
+    cached result and ``.prime(self, result, ...)`` to cache a result that
+    was fetched elsewhere.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        def changed(arguments):
+            """Returns the arguments without other arguments at defaults."""
+            return {
+                name: value for name, value in arguments.items()
+                if name in ('included_mrns', 'limit')
+                or value != signature.parameters[name].default
+            }
+
+        def group_of(self, arguments):
+            other_arguments = tuple(
+                item for item in changed(arguments).items()
+                if item[0] not in ('included_mrns', 'limit')
+            )
+            return (self.fingerprint, method.__name__) + other_arguments
+
+        def lookup(self, k, group, arguments, entry):
+            result = cache.get(k, _MISSING)
+            if result is not _MISSING:
+                entry['cache'] = 'hit'
+                registry.count(self, hit=True, saved_seconds=registry.cost(k))
+                return result
+
+            start = time.time()
+            included_mrns = arguments.get('included_mrns') or None
+            limit = arguments.get('limit')
+            if derive is not None and limit is None:
+                covering = request_index.covering(group, included_mrns, cache)
+                superset = cache.get(covering, _MISSING)
+                if superset is not _MISSING:
+                    result = derive(superset, included_mrns)
+            if result is not _MISSING:
+                entry['cache'] = 'subset'
+                registry.count(
+                    self, hit=True, saved_seconds=registry.cost(covering))
+            elif disk.enabled():
+                disk_key = disk.request_key(
+                    self, method.__name__, changed(arguments))
+                result = disk.load(disk_key)
+                if result is None:
+                    entry['cache'] = 'miss'
+                    registry.count(self, hit=False)
+                    result = method(self, **arguments)
+                    disk.store(disk_key, result)
+                else:
+                    entry['cache'] = 'disk'
+                    registry.count(self, hit=True)
+            else:
+                entry['cache'] = 'miss'
+                registry.count(self, hit=False)
+                result = method(self, **arguments)
+
+            cache[k] = result
+            if k in cache:
+                request_index.add(group, k, included_mrns, limit)
+                registry.register(self, k, cache, time.time() - start)
+            return result
+
+        def bind(self, *args, **kwargs):
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(list(bound.arguments.items())[1:])
+            if arguments.get('included_mrns'):
+                # Computes the MRN fingerprint once for key, index and disk
+                arguments['included_mrns'] = MRNSet.of(
+                    arguments['included_mrns'])
+            return arguments
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            arguments = bind(self, *args, **kwargs)
+            k = key(self, **arguments)
+            group = group_of(self, arguments)
+            with metrics.track(self, method.__name__) as entry:
+                result = lookup(self, k, group, arguments, entry)
+                entry['result'] = result
+                entry['bytes'] = cache.size_of(k)
+            return result
+
+        def is_cached(self, *args, **kwargs) -> bool:
+            """Whether the result for the arguments is cached in memory."""
+            return key(self, **bind(self, *args, **kwargs)) in cache
+
+        def prime(self, result, *args, seconds: float = 0.0, **kwargs):
+            """
+            Caches a result that was fetched elsewhere, e.g. in a batch with
+            other conditions, as if it was requested with the arguments.
+            """
+            arguments = bind(self, *args, **kwargs)
+            k = key(self, **arguments)
+            cache[k] = result
+            if k not in cache:
+                # Larger than the whole budget
+                return
+            request_index.add(
+                group_of(self, arguments),
+                k,
+                arguments.get('included_mrns') or None,
+                arguments.get('limit'),
+            )
+            registry.register(self, k, cache, seconds)
+
+        wrapper.is_cached = is_cached
+        wrapper.prime = prime
+        return wrapper
+    return decorator
 
 
 class _BaseCondition:
@@ -30,6 +208,10 @@ class _BaseCondition:
     OR = 'or'
     AND = 'and'
 
+    # Defaults for subclasses that do not call ``__init__``, like ``MRNs``
+    children = None
+    operator = None
+
     def __init__(
         self,
         mrns: Set[str] = None,
@@ -50,21 +232,230 @@ class _BaseCondition:
         self.operator = operator
         self._attrs = {}
 
-    @cached(cache=mrn_cache, key=_hash_request)
-    def get_mrns(self, limit: Optional[int] = None):
-        """Fetches the mrns of a condition and returns them"""
-        if not self._mrns:
-            self._mrns = self._fetch_mrns(limit=limit)
-        return self._mrns
+    _fingerprint = None
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Stable digest of the condition definition, which is used in the keys
+        of all caches. It is computed once from ``.to_dict()`` and reset by
+        ``._definition_changed()``, which methods that modify the definition
+        after initialization, like ``.age()``, must call.
+        """
+        if self._fingerprint is None:
+            self._fingerprint = self._compute_fingerprint()
+        return self._fingerprint
+
+    def _compute_fingerprint(self) -> str:
+        return digest(self.to_dict())
+
+    def _definition_changed(self):
+        self._fingerprint = None
+
+    @cached(cache=mrn_cache, key=_hash_mrn_request)
+    def get_mrns(self,
+                 limit: Optional[int] = None,
+                 sample: Optional[float] = None,
+                 seed: int = 0):
+        """
+        Fetches the mrns of a condition and returns them
+
+        Args:
+            limit: the maximum number of MRNs
+            sample: fraction of the patients to select by a deterministic
+                hash of their MRN, see ``fiber.database.sampling``. The
+                sample of the same ``seed`` is reproducible and consistent
+                across conditions.
+            seed: the seed of the sample
+        """
+        if sample is not None:
+            return self._fetch_sampled_mrns(sample, seed, limit=limit)
+        return self._mrns or self._fetch_mrns(limit=limit)
+
+    def _fetch_sampled_mrns(self,
+                            sample: float,
+                            seed: int = 0,
+                            limit: Optional[int] = None) -> Set[str]:
+        """
+        Selects the sampled MRNs on the database, see ``._mrn_statement()``,
+        or samples the MRNs after fetching them if that is not possible.
+        """
+        statement = self._mrn_statement()
+        if statement is None:
+            mrns = sample_mrns(self.get_mrns(), sample, seed)
+            return _limit_mrns(mrns, None, limit) if limit else mrns
+
+        mrn = list(statement.alias().c)[0]
+        return self._read_mrns(
+            sql.select([mrn]).where(in_sample(mrn, sample, seed)), limit)
+
+    def _read_mrns(self, statement, limit: Optional[int] = None) -> Set[str]:
+        """Reads the MRNs selected by a statement with one column."""
+        if limit:
+            statement = statement.limit(limit)
+        mrn_df = read_with_progress(statement, get_connection())
+        return set() if mrn_df.empty else set(mrn_df.iloc[:, 0])
 
     def _fetch_mrns(self, limit: Optional[int] = None) -> Set[str]:
         """
         Must be implemented by subclasses to return a set of MRNs for which
         the condition holds true. This is called by ``.get_mrns()``
+
+        Conditions combined with ``&`` and ``|`` fetch their MRNs with a
+        single statement, see ``._mrn_statement()``. If some of the children
+        are not stored in the database, or the MRNs of a child of an ``&``
+        are cached already, the children are evaluated separately instead,
+        see ``._intersect_children()``.
         """
-        raise NotImplementedError
+        if not self.children:
+            raise NotImplementedError
 
-    @cached(cache=data_cache, key=_hash_request)
+        operands = list(self._operands())
+        statement = self._mrn_statement()
+        if statement is not None and not (
+            self.operator == _BaseCondition.AND
+            and any(child.get_mrns.is_cached(child) for child in operands)
+        ):
+            return self._read_mrns(statement, limit)
+
+        if self.operator == _BaseCondition.OR:
+            mrns = reduce(or_, [set(child.get_mrns()) for child in operands])
+        else:
+            mrns = self._intersect_children()
+        return _limit_mrns(mrns, None, limit) if limit else mrns
+
+    def _intersect_children(self, mrns: Optional[Set[str]] = None) -> Set[str]:
+        """
+        Evaluates the children of an ``&`` combination, starting with the one
+        with the fewest estimated MRNs, see ``._estimate_mrn_count()``. The
+        MRNs found so far are passed as filter into the remaining children,
+        unless a child is estimated to hold fewer MRNs, so it is fetched
+        completely. The evaluation stops as soon as no MRNs are left.
+
+        Args:
+            mrns: optional set of MRNs the result is restricted to
+        """
+        estimated = sorted(
+            ((child._estimate_mrn_count(), i, child)
+             for i, child in enumerate(self._operands())),
+            key=lambda item: item[:2],
+        )
+        for estimate, _, child in estimated:
+            if mrns is not None and not mrns:
+                break
+            if mrns is None:
+                mrns = set(child.get_mrns())
+            elif estimate <= len(mrns):
+                mrns = mrns & set(child.get_mrns())
+            else:
+                mrns = child._filter_mrns(mrns)
+        return mrns
+
+    def _filter_mrns(self, mrns: Set[str]) -> Set[str]:
+        """
+        Returns the subset of ``mrns`` for which the condition holds true.
+        Subclasses can overwrite this to restrict their queries to ``mrns``
+        instead of fetching all of their MRNs.
+        """
+        if not mrns:
+            return set()
+        if (
+            self.children and not self._mrns
+            and not self.get_mrns.is_cached(self)
+        ):
+            if self.operator == _BaseCondition.AND:
+                return self._intersect_children(set(mrns))
+            return reduce(
+                or_, [child._filter_mrns(mrns) for child in self._operands()])
+        return set(self.get_mrns()) & set(mrns)
+
+    def _estimate_mrn_count(self) -> int:
+        """
+        Estimates the number of MRNs of the condition. It is exact if the
+        MRNs are cached or can be counted on the database, see ``.count()``,
+        and an upper bound for other combinations.
+        """
+        if (
+            self._mrns or not self.children
+            or self.get_mrns.is_cached(self)
+            or self._mrn_statement() is not None
+        ):
+            return self.count()
+        estimates = [child._estimate_mrn_count() for child in self._operands()]
+        return sum(estimates) if self.operator == _BaseCondition.OR else min(
+            estimates)
+
+    def count(self) -> int:
+        """
+        Returns the number of distinct MRNs of the condition. Unless the MRNs
+        are known or cached already, they are counted on the database with a
+        single ``COUNT`` query, for combinations as well, instead of being
+        fetched. Combinations that can not be expressed in SQL fetch their
+        MRNs.
+
+        Example:
+
+        >>> (Diagnosis('035.%', 'ICD-9') & Patient(gender='Female')).count()
+        1234
+        """
+        if self._mrns:
+            return len(self._mrns)
+        if (
+            not self.get_mrns.is_cached(self)
+            and self._mrn_statement() is not None
+        ):
+            return self._count_mrns()
+        return len(self.get_mrns())
+
+    @cached(cache=mrn_cache, key=_hash_count_request)
+    def _count_mrns(self) -> int:
+        """
+        Counts the distinct MRNs of ``._mrn_statement()`` on the database,
+        without transferring them.
+        """
+        statement = sql.select([sql.func.count()]).select_from(
+            self._mrn_statement().alias())
+        return int(read_with_progress(statement, get_connection()).iloc[0, 0])
+
+    def _mrn_statement(self):
+        """
+        Returns a SQL statement selecting the MRNs of this condition, or None
+        if they can not be selected on the database, e.g. for ``MRNs``.
+
+        The statements of combined conditions are compiled from those of
+        their children: ``|`` becomes a ``UNION`` and ``&`` a semi-join of
+        the children via ``IN`` subqueries.
+        """
+        if self._mrns or not self.children:
+            return None
+
+        statements = [child._mrn_statement() for child in self._operands()]
+        if any(statement is None for statement in statements):
+            return None
+        if self.operator == _BaseCondition.OR:
+            return sql.union(*statements)
+
+        first, *rest = statements
+        mrn = list(first.alias().c)[0]
+        return sql.select([mrn]).where(
+            sql.and_(*[mrn.in_(statement) for statement in rest]))
+
+    def _operands(self):
+        """
+        Yields the children of a combination, with nested combinations of
+        the same operator flattened into one level.
+        """
+        for child in self.children:
+            if (
+                type(child) is _BaseCondition
+                and child.operator == self.operator
+                and not child._mrns
+            ):
+                yield from child._operands()
+            else:
+                yield child
+
+    @cached(cache=data_cache, key=_hash_request, derive=_filter_data)
     def get_data(self,
                  included_mrns: Optional[Set] = None,
                  limit: Optional[int] = None):
@@ -83,18 +474,74 @@ class _BaseCondition:
         """
         Can be implemented by subclasses to return relevant data dependant on
         the condition. This is called by ``.get_data()``
+
+        Combined conditions return the data of all their children for the
+        patients that fulfill the combination.
         """
-        raise NotImplementedError
+        if not self.children:
+            raise NotImplementedError
 
-    def __hash__(self):
+        mrns = set(self.get_mrns())
+        if included_mrns:
+            mrns &= set(included_mrns)
+        if not mrns:
+            return pd.DataFrame(columns=[MRN_COLUMN])
+        # Columns missing in some children are filled with NaN, which
+        # changes their dtype
+        data = apply_declared_dtypes(pd.concat([
+            child.get_data(mrns) for child in self.children
+        ], ignore_index=True, sort=False))
+        return data.head(limit) if limit else data
+
+    @cached(
+        cache=data_cache,
+        key=_hash_occurrence_request,
+        derive=_filter_data,
+    )
+    def get_occurrences(self,
+                        included_mrns: Optional[Set] = None,
+                        limit: Optional[int] = None):
         """
-        Returns a unique hash for the condition definition. The hash is used to
-        cache results of every executed query of the current session.
+        Fetches the distinct occurrences, i.e. ``OCCURRENCE_INDEX`` pairs of
+        MRN and age in days, of this condition for the patients given with
+        ``included_mrns``.
+        """
+        return self._fetch_occurrences(included_mrns, limit=limit)
+
+    def _fetch_occurrences(self,
+                           included_mrns: Optional[Set] = None,
+                           limit: Optional[int] = None):
+        """
+        Derives the occurrences from ``.get_data()``. Can be overwritten by
+        subclasses that are able to fetch the occurrences more efficiently.
+        This is called by ``.get_occurrences()``
+
+        Combined conditions return the occurrences of all their children for
+        the patients that fulfill the combination.
+        """
+        if not self.children:
+            data = self.get_data(included_mrns, limit=limit)
+            return data[OCCURRENCE_INDEX].drop_duplicates()
+
+        mrns = set(self.get_mrns())
+        if included_mrns:
+            mrns &= set(included_mrns)
+        if not mrns:
+            return pd.DataFrame(columns=OCCURRENCE_INDEX)
+        occurrences = pd.concat([
+            child.get_occurrences(mrns)[OCCURRENCE_INDEX]
+            for child in self.children
+        ], ignore_index=True).drop_duplicates()
+        return occurrences.head(limit) if limit else occurrences
 
-        Therefore the hash is based of the json representation of the condition
-        as this would result in the same conditions and database query.
+    def __hash__(self):
+        """
+        Returns a unique hash for the condition definition, derived from its
+        ``.fingerprint``, which is based on the json representation of the
+        condition as this would result in the same conditions and database
+        query.
         """
-        return hash(json.dumps(self.to_dict()))
+        return int(self.fingerprint[:16], 16)
 
     def to_dict(self):
         """
@@ -144,27 +591,32 @@ class _BaseCondition:
 
     def __or__(self, other):
         """
-        Condition objects allow combination with the ``|`` symbol. On the base
-        level this happens via ``Set`` operations on the MRNs that are fetched
-        for each condition individually.
+        Condition objects allow combination with the ``|`` symbol. The
+        combination is evaluated lazily, when its MRNs are requested, see
+        ``._fetch_mrns()``.
         """
         return _BaseCondition(
-                mrns=self.get_mrns() | other.get_mrns(),
-                children=[self, other],
-                operator=_BaseCondition.OR,
-            )
+            children=[self, other],
+            operator=_BaseCondition.OR,
+        )
 
     def __and__(self, other):
         """
-        Condition objects allow combination with the ``&`` symbol. On the base
-        level this happens via ``Set`` operations on the MRNs that are fetched
-        for each condition individually.
+        Condition objects allow combination with the ``&`` symbol. The
+        combination is evaluated lazily, when its MRNs are requested, see
+        ``._fetch_mrns()``.
         """
         return _BaseCondition(
-                mrns=self.get_mrns() & other.get_mrns(),
-                children=[self, other],
-                operator=_BaseCondition.AND,
-            )
+            children=[self, other],
+            operator=_BaseCondition.AND,
+        )
 
     def __len__(self):
-        return len(self.get_mrns())
+        return self.count()
+
+    def __repr__(self):
+        """Shows the combined conditions of a combination"""
+        if not self.children:
+            return super().__repr__()
+        symbol = ' | ' if self.operator == _BaseCondition.OR else ' & '
+        return '(' + symbol.join(map(repr, self.children)) + ')'
@@ -1,6 +1,7 @@
+import time
 from functools import reduce
 from itertools import chain
-from typing import Optional, Set
+from typing import List, Optional, Set
 
 import pandas as pd
 from sqlalchemy import (
@@ -12,11 +13,17 @@ from sqlalchemy import (
 
 import fiber
 from fiber.condition.base import _BaseCondition
+from fiber.config import OCCURRENCE_INDEX
 from fiber.database import (
     compile_sqla,
+    iter_with_progress,
+    READ_CHUNK_SIZE,
     read_with_progress,
 )
-from fiber.database import get_engine
+from fiber.database import get_connection, get_engine
+from fiber.database.dtypes import remove_unused_categories
+from fiber.database.explain import explain, QueryPlan
+from fiber.database.staging import stage_mrns
 from fiber.database.table import Table
 
 
@@ -31,12 +38,47 @@ def _multi_like_clause(column: str, value_or_values):
         else value_or_values
     )
 
-    return reduce(
-        or_,
-        [_case_insensitive_like(column, value) for value in values]
+    return or_(
+        *[_case_insensitive_like(column, value) for value in values]
     )
 
 
+def _is_pattern(value: str) -> bool:
+    return '%' in value or '_' in value
+
+
+def _code_clause(column: str, value_or_values):
+    """
+    Matches codes in ``column`` like ``_multi_like_clause``, but compares
+    the raw column with the upper case values, as codes are stored in upper
+    case, so the database can use its indices. Codes without wildcards are
+    combined into one flat ``IN``, and prefix patterns like ``'035.%'``
+    become plain ``LIKE`` predicates. Other patterns are still matched
+    case-insensitively.
+    """
+    values = (
+        [value_or_values]
+        if isinstance(value_or_values, str)
+        else value_or_values
+    )
+
+    codes, prefixes, patterns = [], [], []
+    for value in dict.fromkeys(values):
+        if not _is_pattern(value):
+            codes.append(value.upper())
+        elif value.endswith('%') and not _is_pattern(value[:-1]):
+            prefixes.append(value.upper())
+        else:
+            patterns.append(value)
+
+    clauses = [column.in_(codes)] if codes else []
+    clauses += [column.like(prefix) for prefix in prefixes]
+    clauses += [
+        _case_insensitive_like(column, pattern) for pattern in patterns
+    ]
+    return or_(*clauses)
+
+
 class _DatabaseCondition(_BaseCondition):
     """
     The DatabaseCondition adds functionality to the BaseCondition which
@@ -47,12 +89,10 @@ class _DatabaseCondition(_BaseCondition):
 
     It should be possible to use this for other databases that use MRNs by
     adjusting the engine. Problems one would need to look into is that database
-    conditions of different DBs are only combined as BaseConditions in
-    ``__and__``, ``__or__``.
+    conditions are combined into single SQL statements in ``__and__`` and
+    ``__or__``, which only works for conditions of the same database.
     """
 
-    engine = get_engine()
-
     def __init__(
         self,
         mrns: Optional[Set[str]] = None,
@@ -81,6 +121,16 @@ class _DatabaseCondition(_BaseCondition):
         self._clause = sql.true() if clause is None else clause
         self.data_columns = data_columns or []
 
+    @property
+    def engine(self):
+        """The engine of the configured database, created on first use."""
+        return get_engine()
+
+    @property
+    def connection(self):
+        """The pooled connection of the current thread."""
+        return get_connection()
+
     @property
     def base_table(self) -> Table:
         """
@@ -136,6 +186,7 @@ class _DatabaseCondition(_BaseCondition):
     @data_columns.setter
     def data_columns(self, value):
         self._specified_columns = value
+        self._definition_changed()
 
     @property
     def clause(self):
@@ -170,14 +221,31 @@ class _DatabaseCondition(_BaseCondition):
         """
         raise NotImplementedError
 
+    def _create_data_query(self, columns: List) -> orm.Query:
+        """
+        Returns the query to select ``columns`` from, which is
+        ``._create_query()`` by default. Subclasses can overwrite this if
+        ``._create_query()`` does not join all tables of the columns.
+        """
+        return self._create_query()
+
+    def _prepare_query(self, columns: Optional[List] = None):
+        """
+        Is called right before the query selecting ``columns``, or the MRNs
+        by default, is executed. Subclasses can fetch what their statement
+        depends on here, so building statements, e.g. for ``.explain()`` or
+        to combine them with others, does not query the database.
+        """
+
     def _fetch_mrns(self,
                     limit: Optional[int] = None):
         """Fetches MRNs from the results of ``._create_query()``."""
+        self._prepare_query()
         q = self._create_query()
         if limit:
             q = q.limit(limit)
 
-        mrn_df = read_with_progress(q.statement, self.engine)
+        mrn_df = read_with_progress(q.statement, self.connection)
         if mrn_df.empty:
             mrn_df = pd.DataFrame(columns=['medical_record_number'])
         assert len(mrn_df.columns) == 1, '_create_query must return only MRNs'
@@ -187,6 +255,41 @@ class _DatabaseCondition(_BaseCondition):
         )
         return result
 
+    def _filter_mrns(self, mrns: Set[str]) -> Set[str]:
+        """
+        Selects only those of ``mrns`` on the database for which the
+        condition holds true, unless all MRNs of the condition are known.
+        """
+        if not mrns or self._mrns or self.get_mrns.is_cached(self):
+            return super()._filter_mrns(mrns)
+        self._prepare_query([self.mrn_column])
+        q = self._data_query(mrns, columns=[self.mrn_column])
+        mrn_df = read_with_progress(q.statement, self.connection, silent=True)
+        return set() if mrn_df.empty else set(mrn_df.iloc[:, 0])
+
+    def _data_query(self,
+                    included_mrns: Optional[Set] = None,
+                    limit: Optional[int] = None,
+                    columns: Optional[List] = None) -> orm.Query:
+        """
+        Builds the query selecting the distinct values of ``columns``, which
+        default to ``.data_columns``, for each patient defined by this
+        condition and via ``included_mrns``.
+        """
+        columns = columns or self.data_columns
+        q = self._create_data_query(columns)
+        if included_mrns and fiber.config.MRN_TEMP_TABLE_ACTIVE:
+            staged = stage_mrns(included_mrns, self.connection)
+            q = q.join(
+                staged,
+                self.mrn_column == staged.c.MEDICAL_RECORD_NUMBER
+            )
+        elif included_mrns:
+            q = q.filter(self.mrn_column.in_(included_mrns))
+        if limit:
+            q = q.limit(limit)
+        return q.with_entities(*columns).distinct()
+
     def _fetch_data(self,
                     included_mrns: Optional[Set] = None,
                     limit: Optional[int] = None):
@@ -195,17 +298,80 @@ class _DatabaseCondition(_BaseCondition):
         defined by this condition and via ``included_mrns`` from the results of
         ``._create_query()``.
         """
-        q = self._create_query()
-        if included_mrns:
-            q = q.filter(self.mrn_column.in_(included_mrns))
-        if limit:
-            q = q.limit(limit)
-        q = q.with_entities(*self.data_columns).distinct()
+        self._prepare_query(self.data_columns)
+        q = self._data_query(included_mrns, limit=limit)
+
+        result = read_with_progress(
+            q.statement, self.connection, silent=bool(included_mrns))
+        return self._format_data(result)
+
+    def _fetch_occurrences(self,
+                           included_mrns: Optional[Set] = None,
+                           limit: Optional[int] = None):
+        """
+        Fetches only the distinct MRNs and ages of this condition, instead of
+        deriving them from all ``.data_columns``.
+        """
+        columns = [
+            self.mrn_column.label('medical_record_number'),
+            self.age_column.label('age_in_days'),
+        ]
+        self._prepare_query(columns)
+        q = self._data_query(included_mrns, limit=limit, columns=columns)
 
         result = read_with_progress(
-            q.statement, self.engine, silent=bool(included_mrns))
+            q.statement, self.connection, silent=bool(included_mrns))
+        if result.empty:
+            result = pd.DataFrame(columns=OCCURRENCE_INDEX)
         return result
 
+    def iter_data(self,
+                  included_mrns: Optional[Set] = None,
+                  limit: Optional[int] = None,
+                  chunk_size: int = READ_CHUNK_SIZE):
+        """
+        Yields the same data as ``.get_data()`` in DataFrames of roughly
+        ``chunk_size`` rows while they arrive from the database. The results
+        are not cached, which allows to process or write out results that
+        do not fit into memory at once.
+
+        Example:
+            >>> for chunk in Diagnosis().iter_data(cohort.mrns):
+            ...     chunk.to_csv('diagnoses.csv', mode='a')
+        """
+        self._prepare_query(self.data_columns)
+        q = self._data_query(included_mrns, limit=limit)
+
+        for chunk in iter_with_progress(
+            q.statement,
+            self.connection,
+            silent=bool(included_mrns),
+            chunk_size=chunk_size,
+        ):
+            yield self._format_data(chunk)
+
+    def explain(self, included_mrns: Optional[Set] = None) -> QueryPlan:
+        """
+        Explains the query of ``.get_data(included_mrns)`` without running
+        it, see ``fiber.database.explain``. The result holds the compiled
+        SQL, the plan of the database, the estimated rows and bytes of the
+        result and the size of the statement relative to the message size
+        limit of the HANA client.
+
+        Example:
+            >>> Diagnosis('035.%', 'ICD-9').explain().plan
+        """
+        q = self._data_query(included_mrns)
+        return explain(q.statement, self.connection)
+
+    def _format_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Can be overwritten by subclasses to adjust the fetched data, e.g. to
+        map values. It is applied to the results of ``.get_data()`` as well as
+        to every chunk of ``.iter_data()``.
+        """
+        return df
+
     def example_values(self):
         """
         Returns ten values of the current condition.
@@ -238,7 +404,8 @@ class _DatabaseCondition(_BaseCondition):
         if not columns:
             raise ValueError('Supply one or multiple columns as arguments.')
 
-        q = self._create_query()
+        self._prepare_query(columns)
+        q = self._create_data_query(columns)
         q = q.group_by(
             *columns
         ).with_entities(
@@ -247,17 +414,18 @@ class _DatabaseCondition(_BaseCondition):
             func.count(count_column).label((label or 'count')).desc()
         )
 
-        return read_with_progress(q.statement, self.engine)
+        return read_with_progress(q.statement, self.connection)
 
     def distinct(self, *columns: Set[str]):
         """Returns distinct values based on the specified ``columns``"""
         if not columns:
             raise ValueError('Supply one or multiple columns as arguments.')
 
-        q = self._create_query()
+        self._prepare_query(columns)
+        q = self._create_data_query(columns)
         q = q.with_entities(*columns).distinct()
 
-        return read_with_progress(q.statement, self.engine)
+        return read_with_progress(q.statement, self.connection)
 
     def to_dict(self):
         obj_dict = super().to_dict()
@@ -273,14 +441,24 @@ class _DatabaseCondition(_BaseCondition):
             obj.data_columns = obj_dict['data_columns']
         return obj
 
+    def _mrn_statement(self):
+        """Selects the MRNs of this condition via ``._create_query()``."""
+        if self._mrns:
+            return None
+        return self._create_query().statement
+
     def __or__(self, other: _BaseCondition):
         """
         The _DatabaseCondition optimizes the SQL statements for ``|`` by
         combining the clauses of condition which run on the same database
-        table. This is done via the ``.base_table`` attribute.
+        table with the same dimensions. This is done via the ``.base_table``
+        attribute. Other conditions are combined lazily, see
+        ``_BaseCondition.__or__``.
         """
         if (
-            self.base_table == other.base_table
+            isinstance(other, _DatabaseCondition)
+            and self.base_table == other.base_table
+            and self.dimensions == other.dimensions
             and not (self._mrns or other._mrns)
         ):
             unique_columns = list(dict.fromkeys(
@@ -295,21 +473,7 @@ class _DatabaseCondition(_BaseCondition):
                 operator=_BaseCondition.OR,
             )
         else:
-            return _BaseCondition(
-                mrns=self.get_mrns() | other.get_mrns(),
-                children=[self, other],
-                operator=_BaseCondition.OR,
-            )
-
-    def __and__(self, other: _BaseCondition):
-        # The SQL queries could theoretically be combined for AND as well, by
-        # running them as subqueries and joining on the MRNs
-        return self.__class__(
-            mrns=self.get_mrns() & other.get_mrns(),
-            dimensions=self.dimensions | other.dimensions,
-            children=[self, other],
-            operator=_BaseCondition.AND,
-        )
+            return super().__or__(other)
 
     def __repr__(self):
         """Shows the running query or the resulting MRNs"""
@@ -324,3 +488,62 @@ class _DatabaseCondition(_BaseCondition):
                 f'{self.__class__.__name__} '
                 f'({clause})'
             )
+
+
+def prefetch_data(
+    conditions: List[_DatabaseCondition],
+    included_mrns: Optional[Set] = None,
+):
+    """
+    Fetches the data of conditions of the same class and dimensions with a
+    single query and caches it per condition, so later calls of
+    ``.get_data(included_mrns)`` and ``.get_occurrences(included_mrns)`` are
+    answered from the cache.
+
+    The query selects the union of the data columns for the OR of all
+    clauses, together with a flag per condition that tells whether a row
+    matches its clause. The rows are split by these flags afterwards.
+
+    Args:
+        conditions: conditions of the same class with the same dimensions
+        included_mrns: the medical record numbers to include
+    """
+    combined = reduce(_DatabaseCondition.__or__, conditions)
+    columns = combined.data_columns
+    flags = []
+    if len(conditions) > 1:
+        flags = [
+            sql.case([(c.clause, 1)], else_=0).label(f'fiber_match_{i}')
+            for i, c in enumerate(conditions)
+        ]
+
+    start = time.time()
+    combined._prepare_query(columns + flags)
+    q = combined._data_query(included_mrns, columns=columns + flags)
+    result = read_with_progress(
+        q.statement, combined.connection, silent=bool(included_mrns))
+    seconds = (time.time() - start) / len(conditions)
+
+    for i, condition in enumerate(conditions):
+        if len(result.columns) != len(columns) + len(flags):
+            # Empty results may come without columns
+            data = pd.DataFrame()
+        else:
+            rows = result
+            if flags:
+                rows = result[result.iloc[:, len(columns) + i] == 1]
+            data = rows.iloc[:, [
+                columns.index(column) for column in condition.data_columns
+            ]].drop_duplicates().reset_index(drop=True)
+            # Formats with the attributes of each condition, e.g. map_values,
+            # which the combined condition does not have
+            data = condition._format_data(remove_unused_categories(data))
+
+        condition.get_data.prime(
+            condition, data, included_mrns, seconds=seconds)
+        if set(OCCURRENCE_INDEX) <= set(data.columns):
+            condition.get_occurrences.prime(
+                condition,
+                data[OCCURRENCE_INDEX].drop_duplicates(),
+                included_mrns,
+            )
@@ -1,17 +1,29 @@
+from collections import defaultdict
 from typing import (
+    Any,
     Iterable,
+    List,
     Optional,
+    Set,
     Union,
 )
 
-from sqlalchemy import orm
+from sqlalchemy import orm, sql
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BooleanClauseList
+from sqlalchemy.sql.util import find_tables
 
+import fiber
+from fiber.cache import mrn_cache
+from fiber.condition.base import _hash_request, cached
 from fiber.condition.database import (
     _case_insensitive_like,
+    _code_clause,
     _DatabaseCondition,
-    _multi_like_clause,
 )
 from fiber.condition.mixins import AgeMixin
+from fiber.database import read_with_progress
+from fiber.database.staging import stage_keys
 from fiber.database.table import (
     b_diag,
     b_mat,
@@ -27,6 +39,32 @@ from fiber.database.table import (
 )
 
 
+def _hash_group_key_request(instance: Any, dimension: str):
+    return f'group_keys/{dimension}/' + _hash_request(instance)
+
+
+def _conjuncts(clause) -> List:
+    """Returns the terms of a clause joined with AND, also nested ones."""
+    if (
+        isinstance(clause, BooleanClauseList)
+        and clause.operator is operators.and_
+    ):
+        return [
+            conjunct for term in clause.clauses
+            for conjunct in _conjuncts(term)
+        ]
+    return [clause]
+
+
+def _column_tables(column) -> Set[str]:
+    """Returns the names of the tables a column or expression refers to."""
+    if isinstance(column, str):
+        return {column.split('.')[-2]} if '.' in column else set()
+    return {
+        table.name for table in find_tables(column, check_columns=True)
+    }
+
+
 class _FactCondition(AgeMixin, _DatabaseCondition):
     """
     Facts are parts of the building-blocks of FIBER. When querying EHR-DB's
@@ -133,7 +171,7 @@ class _FactCondition(AgeMixin, _DatabaseCondition):
                 self.category_column, self._attrs['category'])
 
         if self._attrs['code']:
-            clause &= _multi_like_clause(self.code_column, self._attrs['code'])
+            clause &= _code_clause(self.code_column, self._attrs['code'])
 
         if self._attrs['description']:
             clause &= _case_insensitive_like(
@@ -141,7 +179,7 @@ class _FactCondition(AgeMixin, _DatabaseCondition):
 
         return clause
 
-    def _create_query(self):
+    def _create_query(self, resolve_group_keys: Optional[bool] = None):
         """
         Creates an instance of a SQLAlchemy query which only returns MRNs.
 
@@ -151,7 +189,20 @@ class _FactCondition(AgeMixin, _DatabaseCondition):
 
         This query is also used by other function which change the selected
         columns to get data about the patients.
+
+        With ``FIBER_GROUP_KEY_RESOLUTION_ACTIVE`` the filters on dimensions
+        that are joined via a bridge table are resolved to group keys, see
+        ``._group_keys()``, and the FACT table is filtered by these keys
+        instead of being joined with the bridge and dimension tables. Building
+        the query does not resolve the keys, see ``._filter_group_keys()``.
+
+        Args:
+            resolve_group_keys: whether to resolve the group keys, defaults
+                to ``FIBER_GROUP_KEY_RESOLUTION_ACTIVE``
         """
+        if resolve_group_keys is None:
+            resolve_group_keys = fiber.config.GROUP_KEY_RESOLUTION_ACTIVE
+        split = self._split_clause() if resolve_group_keys else None
 
         q = orm.Query(self.base_table).join(
             d_pers,
@@ -160,11 +211,19 @@ class _FactCondition(AgeMixin, _DatabaseCondition):
             d_pers.MEDICAL_RECORD_NUMBER
         ).distinct()
 
-        q = q.filter(self.clause)
+        if split is None:
+            resolved = {}
+            q = q.filter(self.clause)
+        else:
+            resolved, rest = split
+            if rest:
+                q = q.filter(sql.and_(*rest))
 
         for dim_name in self.dimensions:
             join_definition = self.dimensions_map[dim_name]
-            if len(join_definition) == 2:
+            if dim_name in resolved:
+                q = self._filter_group_keys(q, dim_name)
+            elif len(join_definition) == 2:
                 d_table, b_table = join_definition
                 d_key = f'{dim_name}_key'
                 b_key = f'{dim_name}_group_key'
@@ -183,3 +242,117 @@ class _FactCondition(AgeMixin, _DatabaseCondition):
                     getattr(table, key) == getattr(join_table, join_key)
                 )
         return q
+
+    def _create_data_query(self, columns: List) -> orm.Query:
+        """
+        Resolves the group keys only if none of ``columns`` is selected from
+        the bridge or dimension tables, which are not joined then.
+        """
+        if not self._resolves_group_keys(columns):
+            return self._create_query(resolve_group_keys=False)
+        return self._create_query()
+
+    def _resolves_group_keys(self, columns: Optional[List] = None) -> bool:
+        """
+        Whether the query selecting ``columns`` filters the FACT table by
+        group keys, see ``._create_query()``.
+        """
+        if not fiber.config.GROUP_KEY_RESOLUTION_ACTIVE:
+            return False
+        bridged_tables = {
+            table.name
+            for dim_name in self._bridged_dimensions()
+            for table in self.dimensions_map[dim_name]
+        }
+        return not any(
+            _column_tables(c) & bridged_tables for c in columns or [])
+
+    def _prepare_query(self, columns: Optional[List] = None):
+        """
+        Resolves the group keys the query selecting ``columns`` is filtered
+        by, so they are passed to the database instead of a subquery.
+        """
+        split = self._split_clause() if self._resolves_group_keys(
+            columns) else None
+        for dim_name in split[0] if split else []:
+            self._group_keys(dim_name)
+
+    def _bridged_dimensions(self) -> List[str]:
+        """Returns the dimensions that are joined via a bridge table."""
+        return [
+            dim_name for dim_name in self.dimensions
+            if len(self.dimensions_map[dim_name]) == 2
+        ]
+
+    def _split_clause(self):
+        """
+        Splits the conjunctions of ``.clause`` into the filters of each
+        dimension that is joined via a bridge table and the remaining
+        filters. Returns None if the clause can not be split, e.g. because
+        it combines filters on a dimension and on the FACT table with OR.
+        """
+        dimension_tables = {
+            dim_name: set(self.dimensions_map[dim_name])
+            for dim_name in self._bridged_dimensions()
+        }
+        filters, rest = defaultdict(list), []
+        for conjunct in _conjuncts(self.clause):
+            tables = set(find_tables(conjunct, check_columns=True))
+            owners = [
+                dim_name for dim_name, dim_tables in dimension_tables.items()
+                if tables & dim_tables
+            ]
+            if not owners:
+                rest.append(conjunct)
+            elif len(owners) == 1 and tables <= dimension_tables[owners[0]]:
+                filters[owners[0]].append(conjunct)
+            else:
+                return None
+        return dict(filters), rest
+
+    @cached(cache=mrn_cache, key=_hash_group_key_request)
+    def _group_keys(self, dimension: str) -> Set[int]:
+        """
+        Resolves the group keys of the bridge table of ``dimension`` that
+        belong to dimension entries matching the filters of the condition,
+        e.g. the diagnosis group keys of all codes like ``'035.%'``. The
+        bridge and dimension tables are small compared to the FACT table, and
+        the keys are cached per condition.
+        """
+        q = self._group_key_query(dimension)
+        key_df = read_with_progress(q.statement, self.connection, silent=True)
+        return set() if key_df.empty else set(key_df.iloc[:, 0])
+
+    def _group_key_query(self, dimension: str) -> orm.Query:
+        """Selects the group keys of ``dimension``, see ``._group_keys()``."""
+        d_table, b_table = self.dimensions_map[dimension]
+        d_key = f'{dimension}_key'
+        b_key = f'{dimension}_group_key'
+
+        return orm.Query(b_table).join(
+            d_table,
+            getattr(d_table, d_key) == getattr(b_table, d_key)
+        ).filter(
+            *self._split_clause()[0][dimension]
+        ).with_entities(
+            getattr(b_table, b_key)
+        ).distinct()
+
+    def _filter_group_keys(self, q: orm.Query, dimension: str) -> orm.Query:
+        """
+        Restricts the FACT table to the resolved group keys of ``dimension``,
+        via a temporary table if ``FIBER_MRN_TEMP_TABLE_ACTIVE`` is set and
+        an ``IN`` list otherwise. Keys that are not resolved yet, see
+        ``._prepare_query()``, are selected by a subquery instead.
+        """
+        column = getattr(fact, f'{dimension}_group_key')
+        if not self._group_keys.is_cached(self, dimension):
+            return q.filter(
+                column.in_(self._group_key_query(dimension).statement))
+        keys = sorted(int(key) for key in self._group_keys(dimension))
+        if not keys:
+            return q.filter(sql.false())
+        if fiber.config.MRN_TEMP_TABLE_ACTIVE:
+            staged = stage_keys(keys, self.connection)
+            return q.join(staged, column == staged.c.GROUP_KEY)
+        return q.filter(column.in_(keys))
@@ -1,6 +1,6 @@
 from enum import Enum
 from functools import reduce
-from typing import Optional, Set, Union
+from typing import Optional, Union
 
 import pandas as pd
 from sqlalchemy import or_
@@ -166,27 +166,23 @@ class TobaccoUse(MetaData):
 
         return clause
 
-    def _fetch_data(self,
-                    included_mrns: Optional[Set] = None,
-                    limit: Optional[int] = None):
+    def _format_data(self, df: pd.DataFrame):
         """
-        Fetches the data defined with ``.data_columns`` for each patient
-        defined by this condition and via ``included_mrns`` from the results of
-        ``.create_query()``.
+        Maps the values to the categories defined in ``MAPPING`` if
+        ``map_values`` is set.
 
         Args:
-            included_mrns: the medical record numbers to include
-            limit: if the cohort shall be limited in size,
-                specify positive integer
+            df: the data fetched for the TobaccoUse condition
+
+        Returns:
             df containing the mapped or unmapped values from the db
         """
-        df = super()._fetch_data(included_mrns, limit=limit)
         if self._attrs['map_values']:
             df['value'] = (
                 df.value.map({
                     label: cat for cat, labels in self.MAPPING.items()
                     for label in labels
-                }).astype(pd.api.types.CategoricalDtype(self.Type))
+                }).astype(pd.api.types.CategoricalDtype(list(self.Type)))
             )
         return df
 
@@ -1,5 +1,3 @@
-from typing import Optional, Set
-
 import pandas as pd
 from sqlalchemy import orm
 
@@ -82,14 +80,10 @@ class LabValue(AgeMixin, ComparisonMixin, _DatabaseCondition):
             self.mrn_column
         ).distinct()
 
-    def _fetch_data(self,
-                    included_mrns: Optional[Set] = None,
-                    limit: Optional[int] = None):
+    def _format_data(self, df: pd.DataFrame):
         """
-        LabValue overwrites ``._fetch_data()`` to simplify the result data.
+        LabValue overwrites ``._format_data()`` to simplify the result data.
         """
-        df = super()._fetch_data(included_mrns, limit=limit)
-
         if 'abnormal_flag' in df.columns:
             df['abnormal_flag'] = pd.to_numeric(df.abnormal_flag == 'Y')
         if 'test_name' in df.columns:
@@ -32,6 +32,7 @@ class AgeMixin(ABC):
             'min_days': 365 * min_age if min_age else None,
             'max_days': 365 * max_age if max_age else None
         })
+        self._definition_changed()
         return self
 
     def age_in_days(self,
@@ -41,6 +42,7 @@ class AgeMixin(ABC):
             'min_days': min_days,
             'max_days': max_days
         })
+        self._definition_changed()
         return self
 
     @classmethod
@@ -30,6 +30,7 @@ class ComparisonMixin(ABC):
         if 'comp_operator' in json['attributes']:
             obj._attrs['comp_operator'] = json['attributes']['comp_operator']
             obj._attrs['comp_value'] = json['attributes']['comp_value']
+            obj._definition_changed()
         return obj
 
     # Defining __eq__ requires explicit definition of __hash__
@@ -45,6 +46,7 @@ def _build_method(name: str):
                 'Chaining of multiple comparisons not supported.')
         self._attrs['comp_operator'] = name
         self._attrs['comp_value'] = other
+        self._definition_changed()
 
         return self
     return operator_method
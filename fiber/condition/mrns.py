@@ -4,6 +4,7 @@ import pandas as pd
 
 from fiber.condition.base import _BaseCondition
 from fiber.config import OCCURRENCE_INDEX
+from fiber.utils.fingerprint import digest, frame_digest
 
 
 class MRNs(_BaseCondition):
@@ -60,6 +61,15 @@ class MRNs(_BaseCondition):
             data = data[data.medical_record_number.isin(included_mrns)]
         return data[:limit]
 
+    def _compute_fingerprint(self):
+        # Digests the occurrences directly, which is considerably faster
+        # than serializing each of them in ``.to_dict()``. Values are compared
+        # as strings, as the dtypes depend on how the condition was created.
+        return digest({
+            'class': self.__class__.__name__,
+            'data': frame_digest(self._data.astype(str)),
+        })
+
     def to_dict(self):
         """
         Returns:
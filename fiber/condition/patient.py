@@ -7,6 +7,7 @@ from sqlalchemy import or_, orm
 
 from fiber.condition import _BaseCondition, _DatabaseCondition
 from fiber.condition.database import _case_insensitive_like
+from fiber.config import OCCURRENCE_INDEX
 from fiber.database.table import d_pers, fact
 
 
@@ -135,37 +136,43 @@ class Patient(_DatabaseCondition):
                 operator=_BaseCondition.AND,
             )
         else:
-            return super().__and__(self, other)
+            return super().__and__(other)
 
-    def _fetch_data(
+    def _fetch_occurrences(
         self,
         included_mrns: Optional[Set] = None,
         limit: Optional[int] = None
     ):
         """
-        Fetches the data defined with ``.data_columns`` for each patient
-        defined by this condition and via ``included_mrns`` from the results of
-        ``.create_query()``.
+        The D_PERSON table holds no age column, so patients have no
+        occurrences.
+        """
+        return pd.DataFrame(columns=OCCURRENCE_INDEX)
+
+    def _format_data(self, df: pd.DataFrame):
+        """
+        Maps the values of race and religion to the categories defined in
+        ``RACE_MAPPING`` and ``RELIGION_MAPPING`` if ``map_values`` is set.
 
         Args:
-            included_mrns: the medical record numbers to include
-            limit: if the cohort shall be limited in size,
-                specify positive integer
+            df: the data fetched for the Patient condition
+
+        Returns:
             df containing the mapped or unmapped values from the db
         """
-        df = super()._fetch_data(included_mrns, limit=limit)
         if self._attrs['map_values']:
             df['race'] = (
                 df.race.map({
                     label: cat for cat, labels in self.RACE_MAPPING.items()
                     for label in labels
-                }).astype(pd.api.types.CategoricalDtype(self.RaceType))
+                }).astype(pd.api.types.CategoricalDtype(list(self.RaceType)))
             )
             df['religion'] = (
                 df.religion.map({
                     label: cat for cat, labels in self.RELIGION_MAPPING.items()
                     for label in labels
-                }).astype(pd.api.types.CategoricalDtype(self.ReligionType))
+                }).astype(
+                    pd.api.types.CategoricalDtype(list(self.ReligionType)))
             )
         return df
 
@@ -23,6 +23,53 @@ MIN_DAYS_FILTER_ACTIVE = (
     ) or False
 )
 
+MRN_TEMP_TABLE_ACTIVE = (
+    os.getenv('FIBER_MRN_TEMP_TABLE_ACTIVE') in (
+        'true',
+        'True',
+        '1',
+        'yes'
+    ) or False
+)
+
+GROUP_KEY_RESOLUTION_ACTIVE = (
+    os.getenv('FIBER_GROUP_KEY_RESOLUTION_ACTIVE') in (
+        'true',
+        'True',
+        '1',
+        'yes'
+    ) or False
+)
+
+DOWNCAST_FLOATS = (
+    os.getenv('FIBER_DOWNCAST_FLOATS') in (
+        'true',
+        'True',
+        '1',
+        'yes'
+    ) or False
+)
+
+# Number of threads that run independent queries concurrently, 1 disables it
+MAX_WORKERS = int(os.getenv('FIBER_MAX_WORKERS') or 4)
+
+# Number of processes that run CPU-bound steps like pivoting, 0 disables them
+MAX_PROCESSES = int(os.getenv('FIBER_MAX_PROCESSES') or 0)
+
+# Memory budgets of fiber.cache, least recently used results are evicted
+MRN_CACHE_BYTES = int(os.getenv('FIBER_MRN_CACHE_MB') or 256) * 2 ** 20
+DATA_CACHE_BYTES = int(os.getenv('FIBER_DATA_CACHE_MB') or 2048) * 2 ** 20
+
+# Persistent cache of fiber.cache.disk, disabled if no directory is set
+DISK_CACHE_DIR = os.getenv('FIBER_DISK_CACHE_DIR') or None
+DISK_CACHE_TTL_HOURS = float(os.getenv('FIBER_DISK_CACHE_TTL_HOURS') or 24)
+DISK_CACHE_WATERMARK = os.getenv('FIBER_DISK_CACHE_WATERMARK') or None
+DISK_CACHE_WATERMARK_MINUTES = float(
+    os.getenv('FIBER_DISK_CACHE_WATERMARK_MINUTES') or 15)
+
+# Fetch engine of fiber.database.read_with_progress: 'pandas' or 'columnar'
+READ_ENGINE = os.getenv('FIBER_READ_ENGINE') or 'pandas'
+
 DB_TYPE = os.getenv('FIBER_DB_TYPE') or input('DB Type (hana, mysql, test): ')
 if not DB_TYPE == 'test':
     DB_USER = os.getenv('FIBER_DB_USER') or input('DB User: ')
@@ -38,4 +85,17 @@ else:
     )
     DATABASE_URI = f'sqlite:///{database_path}'
 
+# Connection pool of the hana and mysql engines
+DB_POOL_SIZE = int(os.getenv('FIBER_DB_POOL_SIZE') or 5)
+DB_MAX_OVERFLOW = int(os.getenv('FIBER_DB_MAX_OVERFLOW') or 10)
+DB_POOL_RECYCLE = int(os.getenv('FIBER_DB_POOL_RECYCLE') or 3600)
+DB_POOL_PRE_PING = (
+    os.getenv('FIBER_DB_POOL_PRE_PING') not in (
+        'false',
+        'False',
+        '0',
+        'no'
+    )
+)
+
 OCCURRENCE_INDEX = ['medical_record_number', 'age_in_days']
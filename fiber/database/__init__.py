@@ -1,4 +1,5 @@
 import sys
+import threading
 from importlib import import_module
 
 import pandas as pd
@@ -7,21 +8,72 @@ import sqlparse
 from pyhdb.protocol.constants.general import MAX_MESSAGE_SIZE
 
 from fiber import config
+from fiber.database.columnar import read_columnar
+from fiber.database.dtypes import apply_declared_dtypes, concat_frames
 from fiber.utils import Timer, tqdm
 
 
-def get_engine():
-    return getattr(
-        import_module(f'fiber.database.{config.DB_TYPE}'),
-        'engine'
+_engine = None
+_engine_lock = threading.Lock()
+_local = threading.local()
+
+
+def _backend():
+    return import_module(f'fiber.database.{config.DB_TYPE}')
+
+
+def pool_options():
+    """Returns the ``create_engine`` pool settings from ``fiber.config``."""
+    return dict(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
     )
 
 
+def get_engine():
+    """
+    Returns the engine of the configured database, which is created on first
+    use and then shared by all threads.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = _backend().build_engine()
+    return _engine
+
+
 def get_meta():
-    return getattr(
-        import_module(f'fiber.database.{config.DB_TYPE}'),
-        'meta'
-    )
+    return _backend().meta
+
+
+def get_connection():
+    """
+    Returns the connection of the current thread, checked out from the pool
+    of ``get_engine`` on first use. Session-scoped database objects, like the
+    temporary tables of ``fiber.database.staging``, only exist on this
+    connection, so queries using them must run on it.
+
+    Stale connections are detected on checkout by the ``pool_pre_ping`` and
+    ``pool_recycle`` options of the pool. Worker threads of
+    ``fiber.utils.thread_map`` return their connection with
+    ``release_connection`` after each task.
+    """
+    connection = getattr(_local, 'connection', None)
+    if connection is None or connection.closed or connection.invalidated:
+        connection = get_engine().connect()
+        _local.connection = connection
+    return connection
+
+
+def release_connection():
+    """Returns the connection of the current thread to the pool."""
+    connection = getattr(_local, 'connection', None)
+    if connection is not None and not connection.closed:
+        connection.close()
+    _local.connection = None
 
 
 # DO NOT INCREASE THE CHUNK SIZE BEYOND THIS SIZE
@@ -49,15 +101,12 @@ def print_sqla(query_or_clause, engine):
     ))
 
 
-def read_with_progress(query_or_statement, engine, silent=False):
-    """
-    TEST
-    """
-
+def _prepare_statement(query_or_statement, engine, silent=False):
     if not isinstance(query_or_statement, str):
         # Explicitly compile to check for message size overflow
         # and avoid parameter limit of prepared statements.
-        query_or_statement = compile_sqla(query_or_statement, engine)
+        with Timer(metric='compile_seconds'):
+            query_or_statement = compile_sqla(query_or_statement, engine)
 
     if (
         engine.dialect.dbapi is pyhdb
@@ -68,18 +117,73 @@ def read_with_progress(query_or_statement, engine, silent=False):
     if config.VERBOSE and not silent:
         print(sqlparse.format(query_or_statement, reindent=True))
 
-    with Timer('Server Execution'):
+    return query_or_statement
+
+
+def iter_with_progress(
+    query_or_statement,
+    engine,
+    silent=False,
+    chunk_size=READ_CHUNK_SIZE,
+):
+    """
+    Executes the query and yields its result as typed DataFrames of roughly
+    ``chunk_size`` rows while they arrive from the database. In contrast to
+    ``read_with_progress`` only a single chunk is held in memory at a time.
+    """
+    statement = _prepare_statement(query_or_statement, engine, silent)
+
+    with Timer('Server Execution', metric='server_seconds'):
+        result = engine.execution_options(
+            stream_results=True).execute(statement)
+
+    columns = [column.lower() for column in result.keys()]
+    # Smaller chunks are fetched as such, larger ones in batches the HANA
+    # client can handle
+    batch_size = min(chunk_size, READ_CHUNK_SIZE)
+    try:
+        rows = []
+        for batch in tqdm(iter(
+            lambda: result.fetchmany(batch_size), []
+        )):
+            rows.extend(batch)
+            if len(rows) >= chunk_size:
+                yield apply_declared_dtypes(pd.DataFrame.from_records(
+                    rows, columns=columns, coerce_float=True))
+                rows = []
+        if rows:
+            yield apply_declared_dtypes(pd.DataFrame.from_records(
+                rows, columns=columns, coerce_float=True))
+    finally:
+        result.close()
+
+
+def read_with_progress(query_or_statement, engine, silent=False):
+    """
+    Executes the query and returns its complete result as one DataFrame with
+    lowercase column names. Columns are cast to the compact dtypes declared
+    in ``fiber.database.meta``.
+
+    With ``FIBER_READ_ENGINE=columnar`` the rows are fetched from the cursor
+    into column buffers, see ``fiber.database.columnar``, otherwise pandas
+    reads the result in chunks.
+    """
+    query_or_statement = _prepare_statement(
+        query_or_statement, engine, silent)
+
+    if config.READ_ENGINE == 'columnar':
+        return read_columnar(query_or_statement, engine, READ_CHUNK_SIZE)
+
+    with Timer('Server Execution', metric='server_seconds'):
         chunks = pd.read_sql_query(
             query_or_statement, con=engine, chunksize=READ_CHUNK_SIZE)
-    with Timer('Fetching'):
+    with Timer('Fetching', metric='fetch_seconds'):
         try:
-            result = pd.concat([
-                x for x
-                in tqdm(chunks)
+            result = concat_frames([
+                apply_declared_dtypes(x.rename(columns=str.lower))
+                for x in tqdm(chunks)
             ])
         except ValueError:
             result = pd.DataFrame()
 
-    result.columns = map(str.lower, result.columns)
-
     return result
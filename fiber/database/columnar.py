@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy.engine import Engine
+
+from fiber.database.dtypes import apply_declared_dtypes, DECLARED_DTYPES
+from fiber.utils import Timer, tqdm
+
+
+class _ColumnBuffer:
+    """
+    Preallocated NumPy buffer for the values of one result column. Integer
+    and float columns, as declared in ``fiber.database.meta``, are stored in
+    native arrays with a separate NULL mask, categoricals as integer codes and
+    everything else as objects.
+    """
+
+    def __init__(self, name: str, capacity: int):
+        declared = DECLARED_DTYPES.get(name, '')
+        if declared == 'category':
+            self.kind = 'category'
+            self.values = np.empty(capacity, dtype=np.int32)
+            self.categories = {None: -1}
+        elif declared.startswith('Int'):
+            self.kind = 'int'
+            self.values = np.empty(capacity, dtype=np.int64)
+        elif declared.startswith('float'):
+            self.kind = 'float'
+            self.values = np.empty(capacity, dtype=np.float64)
+        else:
+            self.kind = 'object'
+            self.values = np.empty(capacity, dtype=object)
+        self.mask = np.zeros(capacity, dtype=bool)
+
+    def grow(self, capacity: int):
+        values = np.empty(capacity, dtype=self.values.dtype)
+        values[:len(self.values)] = self.values
+        mask = np.zeros(capacity, dtype=bool)
+        mask[:len(self.mask)] = self.mask
+        self.values, self.mask = values, mask
+
+    def put(self, start: int, column: tuple):
+        end = start + len(column)
+        if self.kind == 'object':
+            self.values[start:end] = column
+            return
+        if self.kind == 'category':
+            categories = self.categories
+            self.values[start:end] = [
+                categories.setdefault(value, len(categories) - 1)
+                for value in column
+            ]
+            return
+
+        values = np.array(column, dtype=object)
+        nulls = np.equal(values, None)
+        values[nulls] = 0
+        try:
+            self.values[start:end] = values.astype(self.values.dtype)
+        except (TypeError, ValueError):
+            # Fall back to objects if the driver returns unexpected types
+            self._to_objects()
+            values[nulls] = None
+            self.values[start:end] = values
+            return
+        self.mask[start:end] = nulls
+
+    def _to_objects(self):
+        values = self.values.astype(object)
+        values[self.mask] = None
+        self.kind = 'object'
+        self.values = values
+
+    def finish(self, length: int):
+        values = self.values[:length]
+        if self.kind == 'category':
+            categorical = pd.Categorical.from_codes(
+                values, categories=list(self.categories)[1:])
+            # Sorted like the categories pandas infers with astype
+            return categorical.reorder_categories(
+                categorical.categories.sort_values())
+        if self.kind == 'int':
+            return pd.arrays.IntegerArray(values, self.mask[:length].copy())
+        if self.kind == 'float':
+            values[self.mask[:length]] = np.nan
+        return values
+
+
+def read_columnar(statement: str, engine, fetch_size: int) -> pd.DataFrame:
+    """
+    Executes the compiled statement on a raw DBAPI cursor and fills the
+    fetched rows directly into column buffers, which grow geometrically. The
+    DataFrame is built once at the end, without intermediate frames per chunk
+    and a final ``pd.concat``.
+
+    Args:
+        statement: the compiled SQL statement
+        engine: the engine or connection to run the statement on
+        fetch_size: number of rows to request per ``cursor.fetchmany``
+
+    Returns:
+        the result with lowercase column names and declared dtypes
+    """
+    if isinstance(engine, Engine):
+        dbapi_connection = engine.raw_connection()
+    else:
+        dbapi_connection = engine.connection
+
+    cursor = dbapi_connection.cursor()
+    try:
+        with Timer('Server Execution', metric='server_seconds'):
+            cursor.execute(statement)
+        names = [
+            description[0].lower()
+            for description in cursor.description
+        ]
+
+        with Timer('Fetching', metric='fetch_seconds'):
+            buffers = [_ColumnBuffer(name, fetch_size) for name in names]
+            capacity, length = fetch_size, 0
+            progress = tqdm()
+            while True:
+                rows = list(cursor.fetchmany(fetch_size))
+                if not rows:
+                    break
+                if length + len(rows) > capacity:
+                    while length + len(rows) > capacity:
+                        capacity *= 2
+                    for buffer in buffers:
+                        buffer.grow(capacity)
+                for buffer, column in zip(buffers, zip(*rows)):
+                    buffer.put(length, column)
+                length += len(rows)
+                progress.update()
+            progress.close()
+    finally:
+        cursor.close()
+        if isinstance(engine, Engine):
+            dbapi_connection.close()
+
+    result = pd.DataFrame({
+        position: buffer.finish(length)
+        for position, buffer in enumerate(buffers)
+    }, columns=range(len(buffers)))
+    result.columns = names
+    return apply_declared_dtypes(result)
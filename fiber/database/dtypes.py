@@ -0,0 +1,123 @@
+from typing import List, Optional
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from sqlalchemy import (
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+)
+
+from fiber import config
+from fiber.database.meta import add_tables
+
+DATETIME = 'datetime64[ns]'
+
+
+def _dtype_for_column(column):
+    """
+    Maps a SQLAlchemy column to the most compact pandas dtype that can hold
+    its values. The ``dtype`` in the column info takes precedence.
+    """
+    if 'dtype' in column.info:
+        return column.info['dtype']
+    if isinstance(column.type, Integer):
+        # Nullable integers, so NULLs do not turn the column into floats
+        return 'Int64'
+    if isinstance(column.type, Float):
+        return 'float64'
+    if isinstance(column.type, DateTime):
+        return DATETIME
+    return None
+
+
+def _declared_dtypes():
+    """
+    Collects the dtypes of all columns declared in
+    ``fiber.database.meta.add_tables`` by their lowercase name, which is how
+    they are named in fetched DataFrames.
+    """
+    dtypes = {}
+    for table in add_tables(MetaData()).tables.values():
+        for column in table.columns:
+            dtype = _dtype_for_column(column)
+            if dtype:
+                dtypes[column.name.lower()] = dtype
+    return dtypes
+
+
+DECLARED_DTYPES = _declared_dtypes()
+
+
+def apply_declared_dtypes(
+    df: pd.DataFrame,
+    downcast_floats: Optional[bool] = None,
+) -> pd.DataFrame:
+    """
+    Casts the columns of a fetched DataFrame to the dtypes declared for them
+    in the table definitions. Columns that are not declared, e.g. computed
+    counts, keep their inferred dtype.
+
+    Args:
+        df: the DataFrame with lowercase column names as fetched from the db
+        downcast_floats: whether float columns, like NUMERIC_VALUE, should be
+            stored as float32. Defaults to ``FIBER_DOWNCAST_FLOATS``.
+
+    Returns:
+        the DataFrame with compact dtypes
+    """
+    if downcast_floats is None:
+        downcast_floats = config.DOWNCAST_FLOATS
+
+    for column in df.columns:
+        dtype = DECLARED_DTYPES.get(column)
+        if dtype == 'float64' and downcast_floats:
+            dtype = 'float32'
+        if dtype is None or pd.api.types.is_dtype_equal(
+                df[column].dtype, dtype):
+            continue
+
+        try:
+            if dtype == DATETIME:
+                df[column] = pd.to_datetime(df[column])
+            else:
+                df[column] = df[column].astype(dtype)
+        except (TypeError, ValueError):
+            # Values that do not match the declaration keep their dtype
+            continue
+
+    return df
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenates typed chunks of a result. Categorical columns are unified
+    beforehand, as pandas falls back to object columns when concatenating
+    categoricals with different categories.
+    """
+    if len(frames) > 1:
+        for column in frames[0].columns:
+            if all(
+                pd.api.types.is_categorical_dtype(frame[column])
+                for frame in frames
+            ):
+                categories = union_categoricals(
+                    [frame[column] for frame in frames]).categories
+                for frame in frames:
+                    frame[column] = frame[column].cat.set_categories(
+                        categories)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def remove_unused_categories(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Removes the categories of categorical columns that do not occur in
+    ``df``, e.g. after selecting the rows of one of several conditions
+    fetched together, so they match a result fetched on its own.
+    """
+    for column in df.columns:
+        if pd.api.types.is_categorical_dtype(df[column]):
+            df[column] = df[column].cat.remove_unused_categories()
+    return df
@@ -0,0 +1,153 @@
+"""
+Query plans of the configured database. ``explain`` asks the database how
+it would execute a statement, without running it, so expensive queries can
+be spotted before they are executed, see ``_DatabaseCondition.explain()``.
+
+Estimated rows are taken from the plan where the dialect provides them:
+the output size of the root operator on HANA and the product of the
+filtered rows of the outer query on MySQL. SQLite does not estimate rows.
+"""
+import sys
+import uuid
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.engine import Connection
+
+from fiber.database import (
+    compile_sqla,
+    get_connection,
+    get_engine,
+    MAX_MESSAGE_SIZE,
+)
+from fiber.database.dtypes import DECLARED_DTYPES
+
+# Assumed average size of string values, as they have no fixed width
+STRING_BYTES = 32
+
+
+class QueryPlan(NamedTuple):
+    """
+    The plan of a statement as returned by ``explain``.
+
+    Attributes:
+        sql: the compiled statement
+        plan: the plan of the database, one row per operator
+        estimated_rows: rows the database expects to return, if known
+        estimated_bytes: estimated size of the result, if rows are known
+        statement_bytes: size of the compiled statement
+        message_size_ratio: ``statement_bytes`` relative to the
+            ``MAX_MESSAGE_SIZE`` of the HANA client, which fails above 1
+    """
+    sql: str
+    plan: pd.DataFrame
+    estimated_rows: Optional[float]
+    estimated_bytes: Optional[float]
+    statement_bytes: int
+    message_size_ratio: float
+
+    def __repr__(self):
+        return (
+            f'QueryPlan(operators={len(self.plan)}, '
+            f'estimated_rows={self.estimated_rows}, '
+            f'estimated_bytes={self.estimated_bytes}, '
+            f'statement_bytes={self.statement_bytes}, '
+            f'message_size_ratio={self.message_size_ratio:.2%})'
+        )
+
+
+def _explain_sqlite(sql: str, connection: Connection):
+    return pd.read_sql_query(f'EXPLAIN QUERY PLAN {sql}', connection), None
+
+
+def _explain_mysql(sql: str, connection: Connection):
+    plan = pd.read_sql_query(f'EXPLAIN {sql}', connection)
+    plan.columns = plan.columns.str.lower()
+    outer = plan[plan.id == plan.id.min()]
+    filtered = (
+        outer.filtered.astype(float).fillna(100) if 'filtered' in outer
+        else 100
+    )
+    rows = (outer.rows.astype(float).fillna(1) * filtered / 100).prod()
+    return plan, float(rows)
+
+
+def _explain_hana(sql: str, connection: Connection):
+    name = f'FIBER_{uuid.uuid4().hex}'
+    connection.execute(
+        f"EXPLAIN PLAN SET STATEMENT_NAME = '{name}' FOR {sql}")
+    try:
+        plan = pd.read_sql_query(
+            'SELECT OPERATOR_ID, PARENT_OPERATOR_ID, LEVEL, OPERATOR_NAME, '
+            'OPERATOR_DETAILS, TABLE_NAME, TABLE_SIZE, OUTPUT_SIZE, '
+            'SUBTREE_COST FROM EXPLAIN_PLAN_TABLE '
+            f"WHERE STATEMENT_NAME = '{name}' ORDER BY OPERATOR_ID",
+            connection,
+        )
+    finally:
+        connection.execute(
+            f"DELETE FROM EXPLAIN_PLAN_TABLE WHERE STATEMENT_NAME = '{name}'")
+    plan.columns = plan.columns.str.lower()
+    rows = None if plan.empty else float(plan.output_size.iloc[0])
+    return plan, rows
+
+
+_EXPLAIN_BY_DIALECT = {
+    'hana': _explain_hana,
+    'mysql': _explain_mysql,
+    'sqlite': _explain_sqlite,
+}
+
+
+def row_bytes(statement) -> int:
+    """
+    Estimates the size of a result row of ``statement`` from the declared
+    dtypes of its columns, see ``fiber.database.dtypes``.
+    """
+    size = 0
+    for key in statement.c.keys():
+        dtype = DECLARED_DTYPES.get(key.split('.')[-1].lower())
+        try:
+            size += np.dtype(dtype).itemsize if dtype else STRING_BYTES
+        except TypeError:
+            # Extension dtypes like nullable integers
+            size += pd.api.types.pandas_dtype(dtype).itemsize
+    return size
+
+
+def explain(
+    statement,
+    connection: Optional[Connection] = None,
+) -> QueryPlan:
+    """
+    Returns the plan of the database for ``statement`` without executing
+    it.
+
+    Args:
+        statement: the SQLAlchemy statement or query to explain
+        connection: the connection to explain it on, defaults to the
+            connection of the current thread. Statements joining temporary
+            tables must be explained on the connection that holds them.
+    """
+    connection = connection or get_connection()
+    statement = getattr(statement, 'statement', statement)
+    sql = compile_sqla(statement, get_engine())
+
+    explain_dialect = _EXPLAIN_BY_DIALECT.get(connection.dialect.name)
+    if explain_dialect is None:
+        plan, rows = pd.DataFrame(), None
+    else:
+        plan, rows = explain_dialect(sql, connection)
+
+    statement_bytes = sys.getsizeof(sql)
+    return QueryPlan(
+        sql=sql,
+        plan=plan,
+        estimated_rows=rows,
+        estimated_bytes=(
+            None if rows is None else rows * row_bytes(statement)
+        ),
+        statement_bytes=statement_bytes,
+        message_size_ratio=statement_bytes / MAX_MESSAGE_SIZE,
+    )
@@ -13,21 +13,24 @@ from fiber.config import (
     DB_SCHEMA,
     DB_USER
 )
+from fiber.database import get_engine, pool_options
 from fiber.database.meta import add_tables
 
 # (TODO) use tunnel https://pypi.org/project/sshtunnel/
 DATABASE_URI = f'hana+pyhdb://{DB_USER}:{DB_PASSWD}@{DB_HOST}:{DB_PORT}/'
 
-engine = create_engine(DATABASE_URI)
+Session = sessionmaker()
 
-Session = sessionmaker(bind=engine)
-session = Session()
+
+def build_engine():
+    """Creates the pooled engine, called on first use by ``get_engine``."""
+    return create_engine(DATABASE_URI, **pool_options())
 
 
 @contextmanager
 def session_scope():
     """Provide a transactional scope around a series of operations."""
-    session = Session()
+    session = Session(bind=get_engine())
     try:
         yield session
         # session.commit()
@@ -38,4 +41,4 @@ def session_scope():
         session.close()
 
 
-meta = add_tables(MetaData(bind=engine, schema=DB_SCHEMA))
+meta = add_tables(MetaData(schema=DB_SCHEMA))
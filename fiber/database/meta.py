@@ -1,28 +1,33 @@
 # flake8: noqa
 from sqlalchemy import Table, Column, Integer, Float, String, DateTime, MetaData
 
+# Column infos overwrite the pandas dtype derived from the column type, see
+# fiber.database.dtypes. Low-cardinality strings are read as categoricals.
+CATEGORICAL = {'dtype': 'category'}
+AGE = {'dtype': 'Int32'}
+
 def add_tables(meta):
 
     D_PERSON = Table(
         'D_PERSON', meta,
         Column('PERSON_KEY', Integer, primary_key=True, default=0),
-        Column('PERSON_TYPE', String, default=''),
+        Column('PERSON_TYPE', String, default='', info=CATEGORICAL),
         Column('MEDICAL_RECORD_NUMBER', String, default=''),
         Column('MOTHER_ACCOUNT_NUMBER', String, default=''),
         Column('DATE_OF_BIRTH', DateTime, default=''),
-        Column('GENDER', String, default=''),
-        Column('RACE', String, default=''),
-        Column('CITIZENSHIP', String, default=''),
-        Column('LANGUAGE', String, default=''),
-        Column('MARITAL_STATUS_CODE', String, default=''),
+        Column('GENDER', String, default='', info=CATEGORICAL),
+        Column('RACE', String, default='', info=CATEGORICAL),
+        Column('CITIZENSHIP', String, default='', info=CATEGORICAL),
+        Column('LANGUAGE', String, default='', info=CATEGORICAL),
+        Column('MARITAL_STATUS_CODE', String, default='', info=CATEGORICAL),
         Column('MARITAL_STATUS_LEGAL_IND', String, default=''),
         Column('MARITAL_STATUS_SOCIAL_IND', String, default=''),
         Column('MARITAL_STATUS_REASON', String, default=''),
-        Column('RELIGION', String, default=''),
+        Column('RELIGION', String, default='', info=CATEGORICAL),
         Column('ADDRESS_TYPE', String, default=''),
         Column('ADDRESS_ZIP', String, default=''),
         Column('ADDRESS_ID', String, default=''),
-        Column('DECEASED_INDICATOR', String, default=''),
+        Column('DECEASED_INDICATOR', String, default='', info=CATEGORICAL),
         Column('LIVING_WILL_INDICATOR', String, default=''),
         Column('ACTIVE_INDICATOR', String, default=''),
         Column('ACTIVE_FLAG', String, default='Y'),
@@ -30,7 +35,7 @@ def add_tables(meta):
         Column('VALID_FLAG', String, default='Y'),
         Column('SOURCE_NAME', String, default=''),
         Column('PERSON_CONTROL_KEY', Integer, default=0),
-        Column('PATIENT_ETHNIC_GROUP', String, default=''),
+        Column('PATIENT_ETHNIC_GROUP', String, default='', info=CATEGORICAL),
         Column('MONTH_OF_BIRTH', String, default=''),
     )
 
@@ -52,14 +57,14 @@ def add_tables(meta):
         Column('UOM_KEY', Integer, default=0),
         Column('DATA_STATE_KEY', Integer, default=0),
         Column('VALUE', String, default=''),
-        Column('AGE_IN_DAYS', Integer, default=0),
+        Column('AGE_IN_DAYS', Integer, default=0, info=AGE),
         Column('NUMERIC_VALUE', Float, default=0),
     )
 
     FD_MATERIAL = Table(
         'FD_MATERIAL', meta,
         Column('MATERIAL_KEY', Integer, primary_key=True, default=0),
-        Column('MATERIAL_TYPE', String, default=''),
+        Column('MATERIAL_TYPE', String, default='', info=CATEGORICAL),
         Column('MATERIAL_NAME', String, default=''),
         Column('GENERIC_NAME', String, default=''),
         Column('BRAND1', String, default=''),
@@ -70,7 +75,7 @@ def add_tables(meta):
         Column('VALID_FLAG', String, default='Y'),
         Column('MATERIAL_CONTROL_KEY', Integer, default=0),
         Column('CONTEXT_MATERIAL_CODE', String, default=''),
-        Column('CONTEXT_NAME', String, default=''),
+        Column('CONTEXT_NAME', String, default='', info=CATEGORICAL),
     )
 
     B_MATERIAL = Table(
@@ -86,7 +91,7 @@ def add_tables(meta):
     FD_DIAGNOSIS = Table(
         'FD_DIAGNOSIS', meta,
         Column('DIAGNOSIS_KEY', Integer, primary_key=True, default=0),
-        Column('DIAGNOSIS_TYPE', String, default=''),
+        Column('DIAGNOSIS_TYPE', String, default='', info=CATEGORICAL),
         Column('DESCRIPTION', String, default=''),
         Column('SOURCE_NAME', String, default=''),
         Column('ACTIVE_FLAG', String, default='Y'),
@@ -94,7 +99,7 @@ def add_tables(meta):
         Column('VALID_FLAG', String, default='Y'),
         Column('DIAGNOSIS_CONTROL_KEY', Integer, default=0),
         Column('CONTEXT_DIAGNOSIS_CODE', String, default=''),
-        Column('CONTEXT_NAME', String, default=''),
+        Column('CONTEXT_NAME', String, default='', info=CATEGORICAL),
     )
 
     B_DIAGNOSIS = Table(
@@ -111,7 +116,7 @@ def add_tables(meta):
         'FD_PROCEDURE', meta,
         Column('ID', Integer, primary_key=True, default=0),
         Column('PROCEDURE_KEY', Integer, default=0),
-        Column('PROCEDURE_TYPE', String, default=''),
+        Column('PROCEDURE_TYPE', String, default='', info=CATEGORICAL),
         Column('PROCEDURE_DESCRIPTION', String, default=''),
         Column('SOURCE_NAME', String, default=''),
         Column('ACTIVE_FLAG', String, default='Y'),
@@ -119,7 +124,7 @@ def add_tables(meta):
         Column('VALID_FLAG', String, default='Y'),
         Column('PROCEDURE_CONTROL_KEY', Integer, default=0),
         Column('CONTEXT_PROCEDURE_CODE', String, default=''),
-        Column('CONTEXT_NAME', String, default=''),
+        Column('CONTEXT_NAME', String, default='', info=CATEGORICAL),
     )
 
     B_PROCEDURE = Table(
@@ -135,8 +140,8 @@ def add_tables(meta):
     D_UNIT_OF_MEASURE = Table(
         'D_UNIT_OF_MEASURE', meta,
         Column('UOM_KEY', Integer, primary_key=True, default=0),
-        Column('UOM_CLASS', String, default=''),
-        Column('UNIT_OF_MEASURE', String, default=''),
+        Column('UOM_CLASS', String, default='', info=CATEGORICAL),
+        Column('UNIT_OF_MEASURE', String, default='', info=CATEGORICAL),
         Column('SOURCE_NAME', String, default=''),
         Column('ACTIVE_FLAG', String, default='Y'),
         Column('ORPHAN_FLAG', String, default='N'),
@@ -145,23 +150,23 @@ def add_tables(meta):
     D_ENCOUNTER = Table(
         'D_ENCOUNTER', meta,
         Column('ENCOUNTER_KEY', Integer, primary_key=True, default=0),
-        Column('ENCOUNTER_TYPE', String, default=''),
+        Column('ENCOUNTER_TYPE', String, default='', info=CATEGORICAL),
         Column('ENCOUNTER_VISIT_ID', String, default=''),
         Column('ENCOUNTER_ACCOUNT_NUMBER', String, default=''),
         Column('MEDICAL_RECORD_NUMBER', String, default=''),
-        Column('EVENT_TYPE', String, default=''),
-        Column('ADMISSION_TYPE', String, default=''),
-        Column('ENCOUNTER_CLASS', String, default=''),
-        Column('ADMISSION_SOURCE', String, default=''),
+        Column('EVENT_TYPE', String, default='', info=CATEGORICAL),
+        Column('ADMISSION_TYPE', String, default='', info=CATEGORICAL),
+        Column('ENCOUNTER_CLASS', String, default='', info=CATEGORICAL),
+        Column('ADMISSION_SOURCE', String, default='', info=CATEGORICAL),
         Column('ENCOUNTER_ACCOUNT_STATUS', String, default=''),
-        Column('ENCOUNTER_SERVICE', String, default=''),
+        Column('ENCOUNTER_SERVICE', String, default='', info=CATEGORICAL),
         Column('ENCOUNTER_ACCOMODATION', String, default=''),
         Column('SPECIALTY_UNIT', String, default=''),
-        Column('DISCHARGE_DISPOSITION', String, default=''),
+        Column('DISCHARGE_DISPOSITION', String, default='', info=CATEGORICAL),
         Column('DISCHARGE_LOCATION_TO', String, default=''),
         Column('ESTIMATED_LENGTH_OF_STAY', Integer, default=0),
-        Column('BEGIN_DATE_AGE_IN_DAYS', Integer, default=0),
-        Column('END_DATE_AGE_IN_DAYS', Integer, default=0),
+        Column('BEGIN_DATE_AGE_IN_DAYS', Integer, default=0, info=AGE),
+        Column('END_DATE_AGE_IN_DAYS', Integer, default=0, info=AGE),
         Column('SOURCE_NAME', String, default=''),
         Column('ACTIVE_FLAG', String, default='Y'),
         Column('ORPHAN_FLAG', String, default='N'),
@@ -180,15 +185,15 @@ def add_tables(meta):
         Column('ORDER_ID', String, default=''),
         Column('ORDER_LINE', Integer, default=0),
         Column('MEDICAL_RECORD_NUMBER', String, default=''),
-        Column('AGE_IN_DAYS', Integer, default=0),
+        Column('AGE_IN_DAYS', Integer, default=0, info=AGE),
         Column('TEST_CODE', Integer, default=0),
-        Column('TEST_NAME', String, default=''),
-        Column('LAB_STATUS', String, default=''),
-        Column('RESULT_STATUS', String, default=''),
-        Column('RESULT_FLAG', String, default=''),
-        Column('ABNORMAL_FLAG', String, default=''),
+        Column('TEST_NAME', String, default='', info=CATEGORICAL),
+        Column('LAB_STATUS', String, default='', info=CATEGORICAL),
+        Column('RESULT_STATUS', String, default='', info=CATEGORICAL),
+        Column('RESULT_FLAG', String, default='', info=CATEGORICAL),
+        Column('ABNORMAL_FLAG', String, default='', info=CATEGORICAL),
         Column('REFERENCE_RANGE', String, default=''),
-        Column('UNIT_OF_MEASUREMENT', String, default=''),
+        Column('UNIT_OF_MEASUREMENT', String, default='', info=CATEGORICAL),
         Column('TEST_RESULT_VALUE', String, default=''),
         Column('NUMERIC_VALUE', Float, default=0),
     )
@@ -198,10 +203,10 @@ def add_tables(meta):
         Column('META_DATA_KEY', Integer, primary_key=True, default=0),
         Column('CONTEXT_KEY', Integer, default=0),
         Column('EXPECTED_UOM_KEY', Integer, default=0),
-        Column('LEVEL1_CONTEXT_NAME', String, default=''),
-        Column('LEVEL2_EVENT_NAME', String, default=''),
-        Column('LEVEL3_ACTION_NAME', String, default=''),
-        Column('LEVEL4_FIELD_NAME', String, default=''),
+        Column('LEVEL1_CONTEXT_NAME', String, default='', info=CATEGORICAL),
+        Column('LEVEL2_EVENT_NAME', String, default='', info=CATEGORICAL),
+        Column('LEVEL3_ACTION_NAME', String, default='', info=CATEGORICAL),
+        Column('LEVEL4_FIELD_NAME', String, default='', info=CATEGORICAL),
         Column('HIPAA_FLAG', String, default='N'),
         Column('ACTIVE_FLAG', String, default='Y'),
         Column('ORPHAN_FLAG', String, default='N'),
@@ -10,6 +10,7 @@ from fiber.config import (
     DB_SCHEMA,
     DB_USER
 )
+from fiber.database import pool_options
 from fiber.database.meta import add_tables
 
 DATABASE_URI = (
@@ -17,6 +18,10 @@ DATABASE_URI = (
     f'@{DB_HOST}:{DB_PORT}/{DB_SCHEMA}'
 )
 
-engine = create_engine(DATABASE_URI)
 
-meta = add_tables(MetaData(bind=engine))
+def build_engine():
+    """Creates the pooled engine, called on first use by ``get_engine``."""
+    return create_engine(DATABASE_URI, **pool_options())
+
+
+meta = add_tables(MetaData())
@@ -0,0 +1,105 @@
+"""
+Deterministic sampling of patients. A patient belongs to the sample of
+fraction ``sample`` and ``seed`` if the bucket of its MRN, a hash of the MRN
+and the seed, falls below ``sample * BUCKETS``. The bucket is computed in the
+query, so only sampled MRNs are transferred. As it only depends on the MRN
+and the seed, samples are reproducible and consistent across conditions:
+the sample of ``A & B`` is the intersection of the samples of ``A`` and
+``B``.
+
+The same hash partitions MRNs into disjoint buckets, so large cohorts can be
+processed part by part, see ``Cohort.partition()``.
+
+The bucket is the integer value of the first four hex digits of the MD5 of
+``'<seed>:<mrn>'``. It is rendered for each dialect, and ``mrn_bucket``
+computes the same value in Python.
+"""
+import hashlib
+from typing import Iterable, List, Set
+
+from sqlalchemy import Integer, literal, String
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+BUCKETS = 16 ** 4
+
+
+def key_bucket(key: str) -> int:
+    """Returns the bucket of a ``'<seed>:<mrn>'`` key."""
+    return int(hashlib.md5(key.encode()).hexdigest()[:4], 16)
+
+
+def mrn_bucket(mrn: str, seed: int = 0) -> int:
+    """Returns the bucket of an MRN as computed on the database."""
+    return key_bucket(f'{seed}:{mrn}')
+
+
+def threshold(sample: float) -> int:
+    """Returns the number of buckets in a sample of fraction ``sample``."""
+    if not 0 < sample <= 1:
+        raise ValueError(f'Sample must be a fraction in (0, 1], not {sample}')
+    return int(round(sample * BUCKETS))
+
+
+def sample_mrns(mrns: Iterable[str], sample: float, seed: int = 0) -> Set:
+    """Returns the MRNs in the sample, like ``in_sample`` on the database."""
+    limit = threshold(sample)
+    return {mrn for mrn in mrns if mrn_bucket(mrn, seed) < limit}
+
+
+def partition_mrns(mrns: Iterable[str], partitions: int) -> List[Set]:
+    """
+    Splits MRNs into ``partitions`` disjoint sets by their bucket. An MRN
+    always falls into the same set for the same number of partitions.
+    """
+    if partitions < 1:
+        raise ValueError(
+            f'Partitions must be a positive number, not {partitions}')
+    parts = [set() for _ in range(partitions)]
+    for mrn in mrns:
+        parts[mrn_bucket(mrn) % partitions].add(mrn)
+    return parts
+
+
+class MRNBucket(FunctionElement):
+    """The bucket of the MRNs in ``column``, see ``mrn_bucket``."""
+    type = Integer()
+    name = 'fiber_mrn_bucket'
+
+    def __init__(self, column, seed: int = 0):
+        self.key = literal(f'{seed}:', String) + column
+        super().__init__(self.key)
+
+
+def in_sample(column, sample: float, seed: int = 0):
+    """
+    Returns a clause that is true for the MRNs in ``column`` which are part
+    of the sample.
+    """
+    return MRNBucket(column, seed) < threshold(sample)
+
+
+@compiles(MRNBucket)
+def _compile_bucket(element, compiler, **kwargs):
+    # Requires the function to be registered, as for SQLite in the test
+    # database
+    return f'fiber_mrn_bucket({compiler.process(element.key, **kwargs)})'
+
+
+@compiles(MRNBucket, 'mysql')
+def _compile_bucket_mysql(element, compiler, **kwargs):
+    key = compiler.process(element.key, **kwargs)
+    return f'CAST(CONV(SUBSTRING(MD5({key}), 1, 4), 16, 10) AS UNSIGNED)'
+
+
+@compiles(MRNBucket, 'hana')
+def _compile_bucket_hana(element, compiler, **kwargs):
+    # HANA can not convert hex strings to integers, so the digits are looked
+    # up one by one
+    key = compiler.process(element.key, **kwargs)
+    digest = f'BINTOHEX(HASH_MD5(TO_BINARY({key})))'
+    return '(' + ' + '.join(
+        f"(LOCATE('0123456789ABCDEF', SUBSTRING({digest}, {i + 1}, 1)) - 1)"
+        f' * {16 ** (3 - i)}'
+        for i in range(4)
+    ) + ')'
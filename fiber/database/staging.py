@@ -0,0 +1,107 @@
+from typing import Iterable
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+)
+from sqlalchemy.engine import Connection
+
+from fiber.utils.fingerprint import MRNSet
+
+# Number of rows sent per INSERT to stay below the message size of the client
+STAGING_CHUNK_SIZE = 10_000
+
+
+def _temporary_table(name: str, column: Column, connection: Connection):
+    """
+    Defines a session-local temporary table in the dialect of the connection.
+    HANA requires local temporary table names to start with ``#``.
+    """
+    if connection.dialect.name == 'hana':
+        return Table(
+            f'#{name}', MetaData(), column, prefixes=['LOCAL TEMPORARY'])
+    return Table(name, MetaData(), column, prefixes=['TEMPORARY'])
+
+
+def _stage(
+    values: Iterable,
+    name: str,
+    column: Column,
+    connection: Connection,
+) -> Table:
+    """
+    Bulk-inserts a set of values into a temporary table with a single
+    ``column`` on the given connection. Every set of values is only staged
+    once per connection, keyed by the fingerprint of the set, see
+    ``fiber.utils.fingerprint.MRNSet``.
+    """
+    values = MRNSet.of(values)
+    # The info dict lives as long as the DBAPI connection and thereby as long
+    # as its temporary tables.
+    staged_tables = connection.info.setdefault(f'fiber_staged_{name}', {})
+    key = values.fingerprint
+
+    if key not in staged_tables:
+        table = _temporary_table(
+            f'FIBER_{name.upper()}_{len(staged_tables)}',
+            column,
+            connection,
+        )
+        table.create(connection)
+
+        rows = [{column.name: value} for value in values]
+        for start in range(0, len(rows), STAGING_CHUNK_SIZE):
+            connection.execute(
+                table.insert(), rows[start:start + STAGING_CHUNK_SIZE])
+
+        staged_tables[key] = table
+
+    return staged_tables[key]
+
+
+def stage_mrns(mrns: Iterable[str], connection: Connection) -> Table:
+    """
+    Bulk-inserts a set of MRNs into a temporary table on the given connection
+    and returns the table, so queries can join against it instead of
+    rendering the MRNs as a literal ``IN`` list. Every set of MRNs is only
+    staged once per connection.
+
+    Args:
+        mrns: the medical record numbers to stage
+        connection: the connection the table is created on, queries joining
+            the table must be executed on the same connection
+
+    Returns:
+        the temporary table holding the MRNs in ``MEDICAL_RECORD_NUMBER``
+    """
+    return _stage(
+        mrns,
+        'mrns',
+        Column('MEDICAL_RECORD_NUMBER', String(255), primary_key=True),
+        connection,
+    )
+
+
+def stage_keys(keys: Iterable[int], connection: Connection) -> Table:
+    """
+    Bulk-inserts a set of integer keys, like the group keys of a bridge
+    table, into a temporary table on the given connection, see
+    ``stage_mrns``.
+
+    Args:
+        keys: the keys to stage
+        connection: the connection the table is created on, queries joining
+            the table must be executed on the same connection
+
+    Returns:
+        the temporary table holding the keys in ``GROUP_KEY``
+    """
+    return _stage(
+        keys,
+        'keys',
+        Column('GROUP_KEY', Integer, primary_key=True),
+        connection,
+    )
@@ -1,16 +1,30 @@
 from sqlalchemy import (
    create_engine,
+   event,
    MetaData,
 )
-from sqlalchemy.orm import sessionmaker
 
 from fiber.config import DATABASE_URI
 from fiber.database.meta import add_tables
-
-engine = create_engine(DATABASE_URI)
-Session = sessionmaker(bind=engine)
-session = Session()
+from fiber.database.sampling import key_bucket
 
 meta = add_tables(MetaData())
 
-meta.create_all(engine)
+
+def build_engine():
+    """
+    Creates the engine and the mock tables, called on first use by
+    ``get_engine``. SQLite connections can not be shared between threads,
+    so the default pool without pooling options is used.
+
+    SQLite has no hash functions, so the MRN buckets of
+    ``fiber.database.sampling`` are registered as a function.
+    """
+    engine = create_engine(DATABASE_URI)
+
+    @event.listens_for(engine, 'connect')
+    def register_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function('fiber_mrn_bucket', 1, key_bucket)
+
+    meta.create_all(engine)
+    return engine
@@ -13,13 +13,29 @@ from .merge import (
     merge_event_dfs,
     merge_to_base,
 )
+from .pivot import (
+    ChunkedPivot,
+    flatten_column_index,
+    pivot_values,
+)
+from .sparse import (
+    aggregate_cells,
+    pivot_sparse,
+    SparsePivot,
+)
 
 __all__ = [
+    'aggregate_cells',
     'aggregate_df_with_windows',
+    'ChunkedPivot',
     'column_threshold_clip',
     'create_id_column',
+    'flatten_column_index',
     'get_name_for_interval',
     'merge_event_dfs',
     'merge_to_base',
+    'pivot_sparse',
+    'pivot_values',
+    'SparsePivot',
     'time_window_clip',
 ]
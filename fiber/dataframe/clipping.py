@@ -16,10 +16,12 @@ def time_window_clip(
         window: inclusive integer interval boundaries
     """
     start, end = window
-    return df[
+    in_window = (
         (df.time_delta_in_days >= start) &
         (df.time_delta_in_days <= end)
-    ]
+    )
+    # Nullable integer deltas compare to <NA> for events without target
+    return df[in_window.fillna(False).astype(bool)]
 
 
 def column_threshold_clip(
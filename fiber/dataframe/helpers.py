@@ -36,8 +36,8 @@ def create_id_column(condition, df):
 
             df['description'] = (
                 condition.__class__.__name__
-                + '__' + df[context_column]
-                + '__' + df[code_column]
+                + '__' + df[context_column].astype(object)
+                + '__' + df[code_column].astype(object)
             )
             del df[context_column]
             del df[code_column]
@@ -0,0 +1,189 @@
+from functools import reduce
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from fiber.config import OCCURRENCE_INDEX
+from fiber.dataframe.clipping import column_threshold_clip
+from fiber.utils import Timer
+
+
+def pivot_values(
+    df: pd.DataFrame,
+    pivot_table_kwargs: dict,
+    threshold: float = 0.5,
+    flatten_columns: bool = True,
+) -> pd.DataFrame:
+    """
+    Pivots values indexed by the occurrence index and removes columns that
+    are filled below a threshold. This is the CPU-bound step of
+    :meth:`fiber.cohort.Cohort.pivot_all_for`, which may run in another
+    process, see :func:`fiber.utils.parallel.process_call`.
+
+    Args:
+        df: values with the id columns to pivot to
+        pivot_table_kwargs: args that should be passed to pd.pivot_table
+        threshold: columns must be filled above this threshold
+        flatten_columns: should column names be flattened from tuples
+    """
+    with Timer('Pivoting'):
+        df = pd.pivot_table(
+            data=df,
+            index=OCCURRENCE_INDEX,
+            values=pivot_table_kwargs['aggfunc'].keys(),
+            **pivot_table_kwargs
+        )
+
+    with Timer('Column threshold clipping'):
+        df = column_threshold_clip(
+            df=df,
+            threshold=threshold
+        )
+
+    if flatten_columns:
+        with Timer('Flatten column index'):
+            flatten_column_index(df)
+
+    return df
+
+
+def flatten_column_index(df: pd.DataFrame):
+    """Inplace flatten pivoted columns to names without the value column."""
+    df.columns = [
+        '__'.join(col[1:]).strip()
+        for col in df.columns.values
+    ]
+
+
+def _common_dtype(dtypes: List) -> np.dtype:
+    try:
+        return np.result_type(*dtypes)
+    except TypeError:
+        return np.dtype(object)
+
+
+def _append_indexes(indexes: List[pd.MultiIndex]) -> pd.MultiIndex:
+    """
+    Appends the indexes of chunks level by level. ``pd.concat`` and
+    ``MultiIndex.append`` infer the dtypes of the levels again, e.g. int64
+    instead of the object levels of nullable integers in pandas 0.24.
+    """
+    first = indexes[0]
+    return pd.MultiIndex.from_arrays(
+        [
+            pd.Index(
+                np.concatenate([
+                    index.get_level_values(level).values
+                    for index in indexes
+                ]),
+                dtype=first.levels[level].dtype,
+            )
+            for level in range(first.nlevels)
+        ],
+        names=first.names,
+    )
+
+
+class ChunkedPivot:
+    """
+    Pivots values chunk by chunk with the same result as
+    :func:`fiber.dataframe.pivot.pivot_values` for all values at once, if
+    the chunks hold disjoint MRNs. Each chunk is pivoted on its own, and only
+    its filled cells, its rows and the fill counts of its columns are kept.
+    Once all chunks were added, the threshold is applied to the global fill
+    rates and only the remaining columns are spread out again. Peak memory
+    thereby scales with the size of a chunk and the number of filled cells,
+    instead of with all values and all rows times all columns.
+
+    Args:
+        pivot_table_kwargs: args that should be passed to pd.pivot_table
+
+    Example:
+
+    >>> pivot = ChunkedPivot(pivot_table_kwargs)
+    >>> for df in chunks:
+    ...     pivot.add(df)
+    >>> pivot.result(threshold=0.1)
+    """
+
+    def __init__(self, pivot_table_kwargs: dict):
+        self.pivot_table_kwargs = pivot_table_kwargs
+        self._rows = 0
+        self._counts = []
+        self._dtypes: Dict[tuple, List] = {}
+        self._chunks = []
+
+    def add(self, df: pd.DataFrame):
+        """
+        Pivots a chunk of values indexed by the occurrence index, see
+        :meth:`fiber.cohort.Cohort.pivot_all_for`.
+        """
+        if df.empty:
+            return
+        df = pivot_values(
+            df,
+            pivot_table_kwargs=self.pivot_table_kwargs,
+            threshold=0,
+            flatten_columns=False,
+        )
+        self._rows += len(df.index)
+        self._counts.append(df.count())
+        for column, dtype in df.dtypes.items():
+            self._dtypes.setdefault(column, []).append(dtype)
+
+        levels = list(range(df.columns.nlevels))
+        self._chunks.append((df.index, df.stack(levels, dropna=True)))
+
+    def result(
+        self,
+        threshold: float = 0.5,
+        flatten_columns: bool = True,
+    ) -> pd.DataFrame:
+        """
+        Returns the pivot of all chunks with the columns that are filled
+        above ``threshold`` in all chunks together.
+
+        Args:
+            threshold: columns must be filled above this threshold
+            flatten_columns: should column names be flattened from tuples
+        """
+        if not self._chunks:
+            return pd.DataFrame()
+
+        with Timer('Column threshold clipping'):
+            counts = reduce(
+                lambda a, b: a.add(b, fill_value=0),
+                self._counts,
+            )
+            columns = counts.index[counts >= self._rows * threshold]
+
+        with Timer('Spreading chunks'):
+            parts = []
+            for index, cells in self._chunks:
+                column_levels = list(range(index.nlevels, cells.index.nlevels))
+                parts.append(
+                    cells.unstack(column_levels).reindex(
+                        index=index, columns=columns)
+                )
+            df = pd.concat(parts)
+            df.index = _append_indexes(
+                [index for index, _ in self._chunks])
+
+        # Reindexing introduces missing values, so chunk dtypes are restored
+        # where they can hold the result. As in a pivot of all values, the
+        # integer and boolean columns of an aggregated value are upcast if
+        # any of its columns misses values, also one below the threshold.
+        incomplete = set(
+            counts.index[counts < self._rows].get_level_values(0))
+        for column in columns:
+            dtype = _common_dtype(self._dtypes[column])
+            value = column[0] if isinstance(column, tuple) else column
+            if dtype.kind in 'iub' and value in incomplete:
+                dtype = np.dtype(float if dtype.kind in 'iu' else object)
+            df[column] = df[column].astype(dtype)
+
+        if flatten_columns:
+            flatten_column_index(df)
+
+        return df
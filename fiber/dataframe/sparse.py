@@ -0,0 +1,211 @@
+"""
+Sparse pivots of condition values. Pivoting descriptions of e.g. Diagnosis
+or Drug creates tens of thousands of mostly empty columns, so instead of
+``pd.pivot_table`` the values are aggregated per occurrence and column in
+long format and put into a SciPy CSR matrix directly, without a dense frame
+in between. The matrix can be passed to scikit-learn as is.
+"""
+from typing import List, NamedTuple
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pandas._libs.sparse import IntIndex
+
+from fiber.config import OCCURRENCE_INDEX
+from fiber.utils import Timer
+
+SPARSE_FORMATS = ('csr', 'pandas')
+
+
+class SparsePivot(NamedTuple):
+    """
+    Pivoted values as returned by ``pivot_all_for`` with ``sparse='csr'``.
+
+    Attributes:
+        matrix: the values, one row per occurrence and one column per pivoted
+            column. Missing values are implicit zeros.
+        index: the occurrence index of the rows
+        columns: the names of the columns
+    """
+    matrix: sp.csr_matrix
+    index: pd.Index
+    columns: pd.Index
+
+    def __repr__(self):
+        return (
+            f'SparsePivot(shape={self.matrix.shape}, '
+            f'stored={self.matrix.nnz})'
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Returns a DataFrame of ``SparseDtype`` columns whose missing values
+        are NaN, like those of a dense pivot.
+        """
+        # Built column by column, as pandas 0.24 has no from_spmatrix
+        matrix = self.matrix.tocsc()
+        matrix.sort_indices()
+        length = matrix.shape[0]
+        df = pd.DataFrame({
+            position: pd.arrays.SparseArray(
+                matrix.data[start:end].astype(float),
+                sparse_index=IntIndex(length, matrix.indices[start:end]),
+                fill_value=np.nan,
+            )
+            for position, (start, end) in enumerate(
+                zip(matrix.indptr[:-1], matrix.indptr[1:]))
+        }, index=self.index)
+        df.columns = self.columns
+        return df
+
+    def reindex(self, index: pd.Index) -> 'SparsePivot':
+        """Returns the rows of ``index``, empty for unknown occurrences."""
+        positions = self.index.get_indexer(index)
+        # Unknown occurrences at -1 select the appended empty row
+        padded = sp.vstack([
+            self.matrix,
+            sp.csr_matrix((1, self.matrix.shape[1])),
+        ]).tocsr()
+        return SparsePivot(padded[positions], index, self.columns)
+
+
+def _aggregate(grouped, value: str, funcs) -> pd.DataFrame:
+    """
+    Aggregates ``value`` with one or a list of functions, with the columns
+    ``pd.pivot_table`` would create for it.
+    """
+    agged = grouped[value].agg(funcs)
+    if isinstance(agged, pd.Series):
+        return agged.to_frame(value)
+    agged.columns = pd.MultiIndex.from_product([[value], agged.columns])
+    return agged
+
+
+def aggregate_cells(
+    df: pd.DataFrame,
+    pivot_table_kwargs: dict,
+) -> pd.Series:
+    """
+    Aggregates values indexed by the occurrence index like
+    ``pd.pivot_table`` with ``columns`` and ``aggfunc``, but returns the
+    filled cells in long format, indexed by occurrence, column values and
+    aggregated value. Cells of disjoint MRNs can be concatenated.
+
+    Args:
+        df: values with the id columns to pivot to
+        pivot_table_kwargs: args that would be passed to pd.pivot_table
+    """
+    if df.empty:
+        return pd.Series(dtype=float)
+
+    columns = list(pivot_table_kwargs.get('columns') or [])
+    aggfunc = pivot_table_kwargs['aggfunc']
+    with Timer('Aggregating cells'):
+        grouped = df.groupby(OCCURRENCE_INDEX + columns, observed=True)
+        # Aggregated per value, as pandas 0.24 does not accept a dict of
+        # lists of functions for a selection of columns
+        agged = pd.concat([
+            _aggregate(grouped, value, funcs)
+            for value, funcs in aggfunc.items()
+        ], axis=1)
+        agged = agged.dropna(how='all')
+        levels = list(range(agged.columns.nlevels))
+        return agged.stack(levels, dropna=True)
+
+
+def _factorize(keys: pd.DataFrame):
+    """
+    Returns the codes of the rows of ``keys`` and the sorted unique keys,
+    keeping the dtypes of the keys, e.g. nullable integer ages.
+    """
+    grouped = keys.groupby(list(keys.columns), sort=True, observed=True)
+    unique = grouped.size().index
+    if isinstance(unique, pd.MultiIndex):
+        # Grouping infers the dtypes of object levels, e.g. nullable
+        # integers in pandas 0.24
+        unique = unique.set_levels([
+            level.astype(object)
+            if pd.api.types.is_object_dtype(keys[column]) else level
+            for level, column in zip(unique.levels, keys.columns)
+        ])
+    return grouped.ngroup().to_numpy(), unique
+
+
+def pivot_sparse(
+    cells: List[pd.Series],
+    pivot_table_kwargs: dict,
+    threshold: float = 0.5,
+    flatten_columns: bool = True,
+) -> SparsePivot:
+    """
+    Pivots cells of ``aggregate_cells`` into a CSR matrix and removes columns
+    that are filled below a threshold, like
+    :func:`fiber.dataframe.pivot.pivot_values` for dense frames.
+
+    Args:
+        cells: cells of one or more chunks of disjoint MRNs
+        pivot_table_kwargs: args that were passed to ``aggregate_cells``
+        threshold: columns must be filled above this threshold
+        flatten_columns: should column names be flattened from tuples
+    """
+    cells = [chunk for chunk in cells if not chunk.empty]
+    if not cells:
+        return SparsePivot(
+            sp.csr_matrix((0, 0)),
+            pd.MultiIndex.from_arrays([[], []], names=OCCURRENCE_INDEX),
+            pd.Index([]),
+        )
+
+    with Timer('Building sparse matrix'):
+        names = cells[0].index.names
+        # Concatenating the cells would infer the dtypes of their index
+        # levels again, so the keys are concatenated as columns
+        keys = pd.concat(
+            [chunk.index.to_frame(index=False) for chunk in cells],
+            ignore_index=True,
+        )
+        keys.columns = range(keys.shape[1])
+        values = np.concatenate([
+            chunk.to_numpy(dtype=float) for chunk in cells])
+        # Cells are indexed by occurrence, column values and aggregated
+        # value, while pivoted columns start with the aggregated value
+        first = len(OCCURRENCE_INDEX)
+        last = first + len(pivot_table_kwargs.get('columns') or [])
+        order = list(range(last, keys.shape[1])) + list(range(first, last))
+        row_codes, rows = _factorize(keys[list(range(first))])
+        column_codes, columns = _factorize(keys[order])
+
+        # Every row holds a cell, so fill rates are counts over all rows
+        counts = np.bincount(column_codes, minlength=len(columns))
+        keep = counts >= len(rows) * threshold
+        kept = keep[column_codes]
+        matrix = sp.csr_matrix(
+            (
+                values[kept],
+                (row_codes[kept], (np.cumsum(keep) - 1)[column_codes[kept]]),
+            ),
+            shape=(len(rows), int(keep.sum())),
+        )
+
+    rows = rows.set_names(OCCURRENCE_INDEX)
+    columns = columns[keep].set_names(
+        [names[level] for level in order])
+    if flatten_columns:
+        columns = pd.Index([
+            '__'.join(col[1:]).strip() for col in columns
+        ])
+    return SparsePivot(matrix, rows, columns)
+
+
+def hstack(pivots: List[SparsePivot], index: pd.Index) -> SparsePivot:
+    """Combines the columns of pivots for the occurrences of ``index``."""
+    pivots = [pivot.reindex(index) for pivot in pivots]
+    return SparsePivot(
+        sp.hstack(
+            [pivot.matrix for pivot in pivots],
+            format='csr',
+        ) if pivots else sp.csr_matrix((len(index), 0)),
+        index,
+        pd.Index([name for pivot in pivots for name in pivot.columns]),
+    )
@@ -0,0 +1,110 @@
+"""
+In-process registry of the queries fiber executed. Each cached request of a
+condition, e.g. ``.get_data()``, records one entry with its timings, the
+size of its result and whether it was answered from the cache.
+
+Example:
+
+>>> cohort.get_pivoted_features()
+>>> fiber.metrics.queries().groupby('condition').total_seconds.sum()
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pandas as pd
+
+from fiber.cache.lru import sizeof
+
+# Only the most recent queries are kept to bound memory of long sessions
+MAX_QUERIES = 10_000
+
+COLUMNS = [
+    'started_at',
+    'fingerprint',
+    'condition',
+    'method',
+    'cache',
+    'compile_seconds',
+    'server_seconds',
+    'fetch_seconds',
+    'total_seconds',
+    'rows',
+    'columns',
+    'bytes',
+]
+
+_queries = deque(maxlen=MAX_QUERIES)
+_local = threading.local()
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _result_shape(result):
+    if isinstance(result, pd.DataFrame):
+        return len(result), len(result.columns)
+    if isinstance(result, (set, frozenset)):
+        return len(result), 1
+    return None, None
+
+
+@contextmanager
+def track(condition, method: str):
+    """
+    Records one query entry for the request ``method`` of ``condition``.
+    Timers with a ``metric`` that run in the block add their elapsed time to
+    it, see ``add``. Nested requests record their own entries.
+
+    Yields:
+        the entry, to be completed with ``cache``, ``result`` and optionally
+        its size in ``bytes``
+    """
+    entry = {
+        'started_at': pd.Timestamp.now(),
+        'fingerprint': condition.fingerprint,
+        'condition': condition.__class__.__name__,
+        'method': method,
+        'cache': None,
+        'compile_seconds': 0.0,
+        'server_seconds': 0.0,
+        'fetch_seconds': 0.0,
+    }
+    stack = _stack()
+    stack.append(entry)
+    start = time.time()
+    try:
+        yield entry
+    finally:
+        stack.pop()
+        entry['total_seconds'] = time.time() - start
+        result = entry.pop('result', None)
+        entry['rows'], entry['columns'] = _result_shape(result)
+        if entry.get('bytes') is None and result is not None:
+            # Results are usually measured by the cache already
+            entry['bytes'] = sizeof(result)
+        _queries.append(entry)
+
+
+def add(metric: str, seconds: float):
+    """Adds ``seconds`` to the ``metric`` of the innermost tracked query."""
+    stack = _stack()
+    if stack:
+        stack[-1][metric] += seconds
+
+
+def queries() -> pd.DataFrame:
+    """
+    Returns all recorded queries of this session, one per row, in the order
+    in which they finished.
+    """
+    return pd.DataFrame(list(_queries), columns=COLUMNS)
+
+
+def clear():
+    """Removes all recorded queries."""
+    _queries.clear()
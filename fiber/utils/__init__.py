@@ -1,3 +1,5 @@
+from .fingerprint import MRNSet
+from .parallel import get_process_executor, process_call, thread_map
 from .timer import Timer
 
 
@@ -20,6 +22,10 @@ else:
     from tqdm import tqdm
 
 __all__ = [
+    'get_process_executor',
+    'MRNSet',
+    'process_call',
+    'thread_map',
     'Timer',
     'tqdm'
 ]
@@ -0,0 +1,44 @@
+import hashlib
+import json
+from typing import Any, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+def digest(obj: Any) -> str:
+    """
+    Returns a SHA-1 digest of a JSON-serializable object. In contrast to
+    ``hash()`` it is the same across Python processes.
+    """
+    serialized = json.dumps(obj, sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode()).hexdigest()
+
+
+def frame_digest(df: pd.DataFrame) -> str:
+    """Returns a SHA-1 digest of the values of a DataFrame."""
+    hashes = pd.util.hash_pandas_object(df, index=False).values
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+class MRNSet(frozenset):
+    """
+    Immutable set of MRNs that computes its order-independent
+    ``fingerprint`` only once, so it can be used cheaply in cache keys.
+    Set operations return plain frozensets.
+    """
+
+    _fingerprint = None
+
+    @classmethod
+    def of(cls, mrns: Iterable[str]) -> 'MRNSet':
+        return mrns if isinstance(mrns, cls) else cls(mrns)
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            hashes = pd.util.hash_array(
+                np.array([str(mrn) for mrn in self], dtype=object))
+            hashes.sort()
+            self._fingerprint = hashlib.sha1(hashes.tobytes()).hexdigest()
+        return self._fingerprint
@@ -0,0 +1,149 @@
+import pickle
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+
+from fiber import config
+
+_executor = None
+_executor_lock = threading.Lock()
+_process_executor = None
+_worker = threading.local()
+
+
+def _run_task(func: Callable, item: Any) -> Any:
+    # Marks the pool thread, as ThreadPoolExecutor has no initializer on
+    # Python 3.6
+    _worker.active = True
+    try:
+        return func(item)
+    finally:
+        # Pool threads live as long as the process, so their connection is
+        # returned to the pool once the task is done
+        from fiber.database import release_connection
+        release_connection()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the thread pool shared by all of fiber, which is created on first
+    use with ``FIBER_MAX_WORKERS`` threads.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=config.MAX_WORKERS,
+                    thread_name_prefix='fiber',
+                )
+    return _executor
+
+
+def thread_map(
+    func: Callable,
+    items: Iterable,
+    parallel: Optional[bool] = None,
+) -> List:
+    """
+    Applies ``func`` to all items on the shared thread pool and returns the
+    results in the order of the items. Exceptions of ``func`` are raised in
+    the calling thread.
+
+    The items are processed inline if there is only one, if parallelism is
+    disabled, or if called from a pool thread, because nested calls waiting
+    for a bounded pool could otherwise deadlock.
+
+    Args:
+        func: function to call with each item
+        items: the items to process
+        parallel: whether to use the pool, defaults to ``FIBER_MAX_WORKERS``
+            being larger than one
+
+    Returns:
+        list of the results of ``func``
+    """
+    items = list(items)
+    if parallel is None:
+        parallel = config.MAX_WORKERS > 1
+    if (
+        not parallel
+        or len(items) < 2
+        or getattr(_worker, 'active', False)
+    ):
+        return [func(item) for item in items]
+
+    futures = [
+        get_executor().submit(_run_task, func, item) for item in items
+    ]
+    return [future.result() for future in futures]
+
+
+def _noop():
+    pass
+
+
+def _on_main_thread() -> bool:
+    return threading.current_thread() is threading.main_thread()
+
+
+def get_process_executor() -> Optional[ProcessPoolExecutor]:
+    """
+    Returns the process pool shared by all of fiber with
+    ``FIBER_MAX_PROCESSES`` processes, or None if it is disabled.
+
+    The pool is created on first use from the main thread, and its processes
+    are forked right away. Forking while other threads are busy could copy
+    locks they hold, e.g. of the caches or of stdout, into the processes, and
+    the pool threads of ``thread_map`` only hold a database connection while
+    they run a task. So the pool is not created from other threads, and
+    should be created before threads are started, like
+    :meth:`fiber.cohort.Cohort.get_pivoted_features` does.
+    """
+    global _process_executor
+    if _process_executor is None and config.MAX_PROCESSES > 0:
+        if not _on_main_thread():
+            return None
+        with _executor_lock:
+            if _process_executor is None:
+                executor = ProcessPoolExecutor(
+                    max_workers=config.MAX_PROCESSES)
+                # Processes are forked on submit, so they are started here
+                for future in [
+                    executor.submit(_noop)
+                    for _ in range(config.MAX_PROCESSES)
+                ]:
+                    future.result()
+                _process_executor = executor
+    return _process_executor
+
+
+def _picklable(value: Any) -> bool:
+    try:
+        pickle.dumps(value)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def process_call(func: Callable, data: Any, **kwargs) -> Any:
+    """
+    Calls ``func(data, **kwargs)`` on the shared process pool and waits for
+    the result, so CPU-bound steps of concurrent threads do not contend for
+    the GIL. ``data``, e.g. a DataFrame, and the result are copied between
+    the processes.
+
+    The call is made inline if ``FIBER_MAX_PROCESSES`` is 0, if the pool was
+    not created on the main thread beforehand, see ``get_process_executor``,
+    or if ``func`` or ``kwargs`` can not be pickled, e.g. because they
+    contain lambdas.
+
+    Args:
+        func: module-level function to call
+        data: the data to process
+        **kwargs: further arguments of ``func``
+    """
+    executor = get_process_executor()
+    if executor is None or not _picklable((func, kwargs)):
+        return func(data, **kwargs)
+    return executor.submit(func, data, **kwargs).result()
@@ -1,6 +1,7 @@
 import time
 
 import fiber
+from fiber import metrics
 
 
 class Timer:
@@ -8,12 +9,14 @@ class Timer:
     Own implementation of timer-functionality, circumventing licence-problems
     """
 
-    def __init__(self, name: str = ''):
+    def __init__(self, name: str = '', metric: str = None):
         """
         Args:
             name: name of the timer to be created
+            metric: column of ``fiber.metrics`` to add the elapsed time to
         """
         self.name = name
+        self.metric = metric
         self.end = None
 
     @property
@@ -42,6 +45,8 @@ class Timer:
             reference to timer-object
         """
         self.end = time.time()
+        if self.metric:
+            metrics.add(self.metric, self.elapsed)
         if self.name and fiber.config.VERBOSE:
             print(f'{self.name} time: {self.elapsed:.2f}s')
 
@@ -0,0 +1,143 @@
+"""
+Fixtures of the test suite, which runs against the SQLite ``test`` backend.
+A fresh database is seeded once per session before ``fiber`` is imported, as
+``fiber.config`` reads the database settings at import time.
+"""
+import datetime
+import os
+import pathlib
+import random
+import tempfile
+
+import pytest
+
+os.environ['FIBER_DB_TYPE'] = 'test'
+os.environ['FIBER_TEST_DB_PATH'] = os.path.join(
+    tempfile.mkdtemp(prefix='fiber-tests-'), 'mock_data.db')
+
+import fiber.cache  # noqa: E402
+from fiber.condition import Patient  # noqa: E402
+from fiber.database import get_engine  # noqa: E402
+from fiber.database.test import meta  # noqa: E402
+
+PATIENTS = 60
+
+DIAGNOSES = [
+    ('ICD-9', '035.1', 'Erysipelas'),
+    ('ICD-9', '035.2', 'Erysipelas of the leg'),
+    ('ICD-10', 'I10', 'Hypertension'),
+    ('ICD-9', '584.9', 'Acute kidney failure'),
+]
+PROCEDURES = [
+    ('ICD-9', '39.61', 'Heart surgery', 'Surgery'),
+    ('EPIC', 'T', 'TEMPERATURE', 'Vital Signs'),
+    ('EPIC', 'P', 'PULSE', 'Vital Signs'),
+]
+TOBACCO_USE = ['Current Every Day Smoker', 'Never Smoker', 'Quit', 'Passive']
+
+
+def seed(engine, patients: int = PATIENTS):
+    """Inserts random, but reproducible, patients and their facts."""
+    tables = meta.tables
+    rng = random.Random(0)
+    races = [
+        Patient.RACE_MAPPING[Patient.RaceType.AFRICAN][0],
+        Patient.RACE_MAPPING[Patient.RaceType.WHITE][0],
+    ]
+    religions = [
+        Patient.RELIGION_MAPPING[religion][0]
+        for religion in list(Patient.RELIGION_MAPPING)[:2]
+    ]
+
+    rows = {name: [] for name in tables}
+    for key, (context, code, description) in enumerate(DIAGNOSES):
+        rows['FD_DIAGNOSIS'].append(dict(
+            DIAGNOSIS_KEY=key, CONTEXT_NAME=context,
+            CONTEXT_DIAGNOSIS_CODE=code, DESCRIPTION=description))
+        rows['B_DIAGNOSIS'].append(dict(
+            ID=key, DIAGNOSIS_KEY=key, DIAGNOSIS_GROUP_KEY=100 + key))
+    for key, (context, code, description, kind) in enumerate(PROCEDURES):
+        rows['FD_PROCEDURE'].append(dict(
+            ID=key, PROCEDURE_KEY=key, CONTEXT_NAME=context,
+            CONTEXT_PROCEDURE_CODE=code, PROCEDURE_DESCRIPTION=description,
+            PROCEDURE_TYPE=kind))
+        rows['B_PROCEDURE'].append(dict(
+            ID=key, PROCEDURE_KEY=key, PROCEDURE_GROUP_KEY=200 + key))
+    rows['D_UNIT_OF_MEASURE'].append(dict(UOM_KEY=1, UNIT_OF_MEASURE='C'))
+    rows['FD_MATERIAL'].append(dict(
+        MATERIAL_KEY=0, MATERIAL_TYPE='Drug', MATERIAL_NAME='Aspirin',
+        CONTEXT_NAME='RX', CONTEXT_MATERIAL_CODE='A1'))
+    rows['B_MATERIAL'].append(dict(
+        ID=0, MATERIAL_KEY=0, MATERIAL_GROUP_KEY=300))
+    rows['D_METADATA'].append(dict(
+        META_DATA_KEY=1, LEVEL2_EVENT_NAME='Tobacco Use',
+        LEVEL4_FIELD_NAME='Status'))
+
+    fact_key = 0
+    for person in range(patients):
+        mrn = f'MRN{person:05d}'
+        rows['D_PERSON'].append(dict(
+            PERSON_KEY=person, MEDICAL_RECORD_NUMBER=mrn,
+            GENDER=rng.choice(['Male', 'Female']),
+            RACE=rng.choice(races), RELIGION=rng.choice(religions),
+            DATE_OF_BIRTH=datetime.datetime(1980, 1, 1)))
+        for _ in range(rng.randint(1, 6)):
+            fact_key += 1
+            fact = dict(
+                FACT_KEY=fact_key, PERSON_KEY=person,
+                AGE_IN_DAYS=rng.randint(1000, 20000))
+            kind = rng.random()
+            if kind < 0.5:
+                fact['DIAGNOSIS_GROUP_KEY'] = 100 + rng.randrange(
+                    len(DIAGNOSES))
+            elif kind < 0.8:
+                fact['PROCEDURE_GROUP_KEY'] = 200 + rng.randrange(
+                    len(PROCEDURES))
+                fact['NUMERIC_VALUE'] = rng.uniform(30, 40)
+                fact['UOM_KEY'] = 1
+            elif kind < 0.9:
+                fact['MATERIAL_GROUP_KEY'] = 300
+            else:
+                fact['META_DATA_KEY'] = 1
+                fact['VALUE'] = rng.choice(TOBACCO_USE)
+            rows['FACT'].append(fact)
+        for order in range(rng.randint(0, 3)):
+            rows['EPIC_LAB'].append(dict(
+                ID=len(rows['EPIC_LAB']), ORDER_ID=f'{mrn}-{order}',
+                MEDICAL_RECORD_NUMBER=mrn,
+                AGE_IN_DAYS=rng.randint(1000, 20000), TEST_CODE=1,
+                TEST_NAME=rng.choice(['GLUCOSE', 'HEMOGLOBIN']),
+                ABNORMAL_FLAG=rng.choice(['Y', 'N']), RESULT_FLAG='H',
+                NUMERIC_VALUE=rng.uniform(1, 10),
+                UNIT_OF_MEASUREMENT='mg'))
+
+    # Rows of one executemany must have the same keys
+    for name, table_rows in rows.items():
+        by_keys = {}
+        for row in table_rows:
+            by_keys.setdefault(tuple(sorted(row)), []).append(row)
+        for same_keys in by_keys.values():
+            engine.execute(tables[name].insert(), same_keys)
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    engine = get_engine()
+    seed(engine)
+    return engine
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    """Every test starts without cached results."""
+    fiber.cache.clear()
+    yield
+    fiber.cache.clear()
+
+
+@pytest.fixture
+def disk_cache(tmpdir, monkeypatch):
+    """Enables the persistent cache in a temporary directory."""
+    monkeypatch.setattr(fiber.config, 'DISK_CACHE_DIR', str(tmpdir))
+    yield pathlib.Path(str(tmpdir))
+    fiber.cache.disk.clear()
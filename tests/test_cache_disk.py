@@ -0,0 +1,75 @@
+import pandas as pd
+
+import fiber.cache
+from fiber import config
+from fiber.cache import disk
+from fiber.condition import Diagnosis, LabValue, Patient
+from fiber.database import get_engine
+
+
+def test_disk_hit_equals_fresh_fetch(disk_cache):
+    for condition in [LabValue(), Patient(), Diagnosis()]:
+        fresh = condition.get_data()
+        fiber.cache.clear()
+        stored = condition.get_data()
+
+        pd.testing.assert_frame_equal(fresh, stored)
+
+
+def test_disk_hit_keeps_formatted_lab_values(disk_cache):
+    fresh = LabValue().get_data()
+    fiber.cache.clear()
+    stored = LabValue().get_data()
+
+    assert stored.abnormal_flag.dtype == fresh.abnormal_flag.dtype
+    assert stored.abnormal_flag.tolist() == fresh.abnormal_flag.tolist()
+
+
+def test_watermark_is_checked_again(monkeypatch):
+    monkeypatch.setattr(
+        config,
+        'DISK_CACHE_WATERMARK',
+        'SELECT COUNT(*) FROM D_UNIT_OF_MEASURE',
+    )
+    disk.reset_watermark()
+    before = disk.watermark()
+
+    get_engine().execute(
+        "INSERT INTO D_UNIT_OF_MEASURE (UOM_KEY, UNIT_OF_MEASURE) "
+        "VALUES (99, 'mg')")
+    try:
+        assert disk.watermark() == before
+
+        monkeypatch.setattr(config, 'DISK_CACHE_WATERMARK_MINUTES', 0)
+        assert disk.watermark() != before
+    finally:
+        get_engine().execute(
+            'DELETE FROM D_UNIT_OF_MEASURE WHERE UOM_KEY = 99')
+        disk.reset_watermark()
+
+
+def stored_fingerprints(directory):
+    return {path.parent.name for path in directory.glob('*/*/*.parquet')}
+
+
+def test_invalidate_removes_stored_results_of_parents(disk_cache):
+    child = Diagnosis('035.1', 'ICD-9')
+    parent = child | Diagnosis('I10', 'ICD-10')
+    other = Diagnosis('584.9', 'ICD-9')
+    for condition in [child, parent, other]:
+        condition.get_mrns()
+
+    fiber.cache.invalidate(child, persistent=True)
+
+    assert stored_fingerprints(disk_cache) == {other.fingerprint}
+
+
+def test_invalidate_keeps_stored_results_of_children(disk_cache):
+    child = Diagnosis('035.1', 'ICD-9')
+    parent = child | Diagnosis('I10', 'ICD-10')
+    for condition in [child, parent]:
+        condition.get_mrns()
+
+    fiber.cache.invalidate(parent, persistent=True)
+
+    assert stored_fingerprints(disk_cache) == {child.fingerprint}
@@ -0,0 +1,36 @@
+from fiber.cache import LRUCache, sizeof
+
+
+def value(key):
+    return {f'MRN{key}{i:03d}' for i in range(10)}
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = LRUCache(max_bytes=sizeof(value(0)) * 5 // 2)
+    cache[0] = value(0)
+    cache[1] = value(1)
+    cache[0]
+    cache[2] = value(2)
+
+    assert 0 in cache and 2 in cache
+    assert 1 not in cache
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_values_larger_than_budget_are_not_cached():
+    cache = LRUCache(max_bytes=sizeof(value(0)) - 1)
+    cache[0] = value(0)
+
+    assert 0 not in cache
+    assert cache.current_bytes == 0
+
+
+def test_shrinking_evicts_entries():
+    cache = LRUCache(max_bytes=sizeof(value(0)) * 3)
+    for key in range(3):
+        cache[key] = value(key)
+
+    cache.resize(sizeof(value(0)))
+
+    assert list(cache._data) == [2]
+    assert cache.current_bytes == cache.size_of(2)
@@ -0,0 +1,49 @@
+import pytest
+
+import fiber.cache
+from fiber.cache import data_cache, mrn_cache, registry
+from fiber.condition import Diagnosis, Patient
+
+
+@pytest.fixture
+def small_cache():
+    """Limits the data cache to about two results."""
+    max_bytes = data_cache.max_bytes
+    Diagnosis('035.1', 'ICD-9').get_data()
+    fiber.cache.resize(data_bytes=data_cache.current_bytes * 2)
+    fiber.cache.clear()
+    yield
+    fiber.cache.resize(data_bytes=max_bytes)
+
+
+def registered_keys():
+    keys = set(registry._entries) | set(registry._owners)
+    return keys.union(*registry._keys.values())
+
+
+def test_evicted_keys_are_dropped(small_cache):
+    conditions = [
+        Diagnosis('035.1', 'ICD-9'),
+        Diagnosis('035.2', 'ICD-9'),
+        Diagnosis('I10', 'ICD-10'),
+        Diagnosis('584.9', 'ICD-9'),
+    ]
+    for condition in conditions:
+        condition.get_data()
+
+    assert len(data_cache) < len(conditions)
+    assert registered_keys() == set(data_cache._data)
+    assert registry.stats().loc['Diagnosis', 'entries'] == len(data_cache)
+
+
+def test_invalidated_keys_are_dropped():
+    child = Patient(gender='Female')
+    parent = Diagnosis('I10', 'ICD-10') & child
+    parent.get_mrns()
+    Diagnosis('035.1', 'ICD-9').get_mrns()
+    keys = set(mrn_cache._data)
+
+    fiber.cache.invalidate(child)
+
+    assert set() < set(mrn_cache._data) < keys
+    assert registered_keys() == set(mrn_cache._data)
@@ -0,0 +1,52 @@
+import pandas as pd
+
+import fiber.cache
+import fiber.metrics
+from fiber.cache import LRUCache, RequestIndex
+from fiber.condition import Diagnosis
+
+
+def last_cache_state():
+    return fiber.metrics.queries().cache.iloc[-1]
+
+
+def test_subset_is_derived_from_cached_superset():
+    condition = Diagnosis('035.1', 'ICD-9')
+    mrns = sorted(condition.get_mrns())[:3]
+    fresh = condition.get_data(included_mrns=mrns)
+    fiber.cache.clear()
+
+    condition.get_data()
+    derived = condition.get_data(included_mrns=mrns)
+
+    assert last_cache_state() == 'subset'
+    pd.testing.assert_frame_equal(derived, fresh)
+
+
+def test_limited_request_is_fetched():
+    condition = Diagnosis('035.1', 'ICD-9')
+    fresh_data = condition.get_data(limit=3)
+    fresh_mrns = condition.get_mrns(limit=3)
+    fiber.cache.clear()
+
+    condition.get_data()
+    condition.get_mrns()
+
+    pd.testing.assert_frame_equal(condition.get_data(limit=3), fresh_data)
+    assert condition.get_mrns(limit=3) == fresh_mrns
+    assert last_cache_state() == 'miss'
+
+
+def test_evicted_requests_are_dropped_from_index():
+    cache = LRUCache(max_bytes=2000)
+    index = RequestIndex()
+    cache.on_evict(index.discard)
+
+    for key in range(3):
+        mrns = frozenset(f'MRN{key}{i}' for i in range(10))
+        cache[key] = set(mrns)
+        index.add('group', key, mrns, None)
+
+    assert 0 not in cache
+    assert index.covering('group', frozenset(['MRN21']), cache) == 2
+    assert set(index._groups) == set(cache._data)
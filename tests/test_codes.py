@@ -0,0 +1,35 @@
+import pytest
+
+from fiber.condition import Diagnosis
+from fiber.condition.database import _code_clause
+from fiber.database.table import fd_diag
+
+
+@pytest.mark.parametrize('codes', [
+    ['035.1', '035.2'],
+    ['035.%', '584.9'],
+    ['035._'],
+    ['584.9', '035.1', '035.1'],
+])
+def test_code_list_matches_any_of_its_codes(codes):
+    expected = set().union(*[
+        Diagnosis(code, 'ICD-9').get_mrns() for code in codes])
+
+    assert Diagnosis(codes, 'ICD-9').get_mrns() == expected
+
+
+def test_codes_are_matched_case_insensitively():
+    mrns = Diagnosis('I10', 'ICD-10').get_mrns()
+
+    assert mrns
+    assert Diagnosis('i10', 'ICD-10').get_mrns() == mrns
+
+
+def test_exact_codes_are_compared_in_one_list():
+    clause = _code_clause(
+        fd_diag.CONTEXT_DIAGNOSIS_CODE, ['035.1', '035.2', '584.%'])
+    sql = str(clause.compile(compile_kwargs={'literal_binds': True}))
+
+    assert sql.count(' IN ') == 1
+    assert sql.count(' LIKE ') == 1
+    assert 'lower' not in sql.lower()
@@ -0,0 +1,58 @@
+from fiber import Cohort
+from fiber.condition import Diagnosis, Patient
+
+
+def test_partition_leaves_out_empty_parts():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+    parts = cohort.partition(4 * len(cohort.mrns))
+
+    assert all(part.mrns for part in parts)
+    assert set().union(*[part.mrns for part in parts]) == set(cohort.mrns)
+    assert sum(len(part.mrns) for part in parts) == len(cohort.mrns)
+
+
+def test_parts_fetch_only_their_values():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+    for part in cohort.partition(4 * len(cohort.mrns)):
+        values = part.values_for(Diagnosis())
+        assert set(values.medical_record_number) == set(part.mrns)
+
+
+def test_partition_of_empty_cohort():
+    cohort = Cohort(Diagnosis('999.9', 'ICD-9'))
+
+    assert cohort.partition(4) == []
+    assert cohort.map_partitions(
+        lambda part: part.values_for(Diagnosis()), partitions=4).empty
+
+
+def test_mrns_can_be_changed():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+    removed = sorted(cohort.mrns)[0]
+    cohort.get(Diagnosis())
+
+    cohort.mrns.discard(removed)
+
+    values = cohort.get(Diagnosis())
+    assert removed not in set(values.medical_record_number)
+    assert set(values.medical_record_number) == cohort.mrns
+
+
+def test_mrn_fingerprint_is_computed_once():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+
+    assert cohort._mrn_set is cohort._mrn_set
+
+
+def test_data_of_and_combination():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9') | Diagnosis('I10', 'ICD-10'))
+    condition = Diagnosis('035.1', 'ICD-9') & Patient(gender='Female')
+    mrns = condition.get_mrns() & cohort.mrns
+
+    data = cohort.get(condition)
+    values = cohort.values_for(condition)
+
+    assert mrns
+    assert set(data.medical_record_number) == mrns
+    assert set(data.gender.dropna()) == {'Female'}
+    assert set(values.dropna(subset=['gender']).medical_record_number) == mrns
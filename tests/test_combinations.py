@@ -0,0 +1,55 @@
+from functools import reduce
+from operator import and_, or_
+
+import fiber.cache
+from fiber.condition import Diagnosis, LabValue, MRNs, Patient
+
+
+def children():
+    return [
+        Diagnosis('035.1', 'ICD-9'),
+        Patient(gender='Female'),
+        LabValue('GLUCOSE'),
+    ]
+
+
+def test_combinations_select_the_mrns_of_their_children():
+    mrns = [child.get_mrns() for child in children()]
+
+    assert reduce(or_, children()).get_mrns() == set.union(*mrns)
+    assert reduce(and_, children()).get_mrns() == set.intersection(*mrns)
+
+
+def test_combinations_are_evaluated_lazily():
+    combined = Diagnosis('035.1', 'ICD-9') & Patient(gender='Female')
+
+    assert not combined.get_mrns.is_cached(combined)
+    assert not any(
+        child.get_mrns.is_cached(child) for child in combined.children)
+
+
+def test_combinations_with_mrns():
+    mrns = sorted(Patient().get_mrns())[:10]
+    condition = Diagnosis('035.1', 'ICD-9')
+
+    assert (condition & MRNs(mrns)).get_mrns() == (
+        condition.get_mrns() & set(mrns))
+    assert (condition | MRNs(mrns)).get_mrns() == (
+        condition.get_mrns() | set(mrns))
+
+
+def test_planned_intersection_equals_single_statement():
+    expected = reduce(and_, children()).get_mrns()
+    fiber.cache.clear()
+    # A cached child makes the children be evaluated one after another
+    conditions = children()
+    conditions[1].get_mrns()
+
+    assert reduce(and_, conditions).get_mrns() == expected
+
+
+def test_intersection_without_mrns_stops_early():
+    conditions = children() + [Diagnosis('999.9', 'ICD-9')]
+    conditions[0].get_mrns()
+
+    assert reduce(and_, conditions).get_mrns() == set()
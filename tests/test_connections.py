@@ -0,0 +1,30 @@
+import threading
+
+from fiber.database import get_connection, get_engine, release_connection
+
+
+def in_thread(func):
+    results = []
+    thread = threading.Thread(target=lambda: results.append(func()))
+    thread.start()
+    thread.join()
+    return results[0]
+
+
+def test_engine_is_shared_by_threads():
+    assert in_thread(get_engine) is get_engine()
+
+
+def test_connection_is_reused_per_thread():
+    connection = get_connection()
+
+    assert get_connection() is connection
+    assert in_thread(get_connection) is not connection
+
+
+def test_released_connection_is_replaced():
+    connection = get_connection()
+    release_connection()
+
+    assert connection.closed
+    assert get_connection() is not connection
@@ -0,0 +1,31 @@
+import pytest
+
+from fiber import Cohort
+from fiber.condition import Diagnosis, MRNs, Patient
+
+
+@pytest.mark.parametrize('condition', [
+    Diagnosis('035.1', 'ICD-9'),
+    Patient(gender='Female'),
+    Diagnosis('035.1', 'ICD-9') & Patient(gender='Female'),
+    Diagnosis('035.1', 'ICD-9') | Diagnosis('I10', 'ICD-10'),
+    MRNs(['MRN00001', 'MRN00002']),
+])
+def test_count_equals_number_of_mrns(condition):
+    assert len(condition) == len(condition.get_mrns())
+
+
+def test_count_does_not_fetch_mrns():
+    condition = Diagnosis('035.1', 'ICD-9')
+    len(condition)
+
+    assert not condition.get_mrns.is_cached(condition)
+
+
+def test_cohort_count():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+    count = len(cohort)
+
+    assert count == len(cohort.mrns)
+    cohort.exclude(sorted(cohort.mrns)[:1])
+    assert len(cohort) == count - 1
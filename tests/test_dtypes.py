@@ -0,0 +1,42 @@
+import pandas as pd
+
+from fiber import Cohort
+from fiber.condition import Diagnosis, Measurement, Patient
+from fiber.database.dtypes import apply_declared_dtypes
+
+
+def test_data_has_declared_dtypes():
+    diagnoses = Diagnosis().get_data()
+    patients = Patient().get_data()
+
+    assert pd.api.types.is_categorical_dtype(diagnoses.context_name)
+    assert pd.api.types.is_integer_dtype(diagnoses.age_in_days)
+    assert pd.api.types.is_categorical_dtype(patients.gender)
+
+
+def test_declared_dtypes_are_applied_once():
+    df = apply_declared_dtypes(pd.DataFrame({
+        'context_name': pd.Categorical(['ICD-9', 'ICD-10']),
+        'numeric_value': [1.5, 2.5],
+    }), downcast_floats=True)
+
+    assert pd.api.types.is_categorical_dtype(df.context_name)
+    assert df.numeric_value.dtype == 'float32'
+
+
+def test_time_series_groups_observed_codes():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+    values = cohort.values_for(Measurement()).dropna(subset=['numeric_value'])
+    days = values.astype({'context_name': object}).drop_duplicates([
+        'medical_record_number',
+        'age_in_days',
+        'time_delta_in_days',
+        'context_procedure_code',
+        'context_name',
+    ])
+
+    series = cohort.time_series_for(
+        Measurement(), aggregate_value_per_day_func='mean')
+
+    assert len(series) == len(days)
+    assert series.numeric_value.notna().all()
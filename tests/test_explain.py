@@ -0,0 +1,20 @@
+from fiber import Cohort
+from fiber.condition import Diagnosis, LabValue
+
+
+def test_explain_does_not_fetch_data():
+    condition = Diagnosis('035.1', 'ICD-9')
+    plan = condition.explain()
+
+    assert plan.sql.lstrip().upper().startswith('SELECT')
+    assert not plan.plan.empty
+    assert 0 < plan.message_size_ratio < 1
+    assert not condition.get_data.is_cached(condition)
+
+
+def test_explain_plan_of_cohort_query():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+    plan = cohort.explain_plan(LabValue())
+
+    assert plan.statement_bytes > 0
+    assert 'EPIC_LAB' in plan.sql.upper()
@@ -0,0 +1,58 @@
+import pytest
+
+import fiber.cache
+from fiber import config
+from fiber.condition import Diagnosis
+
+CONDITIONS = [
+    Diagnosis('035.%', 'ICD-9'),
+    Diagnosis(['035.1', '584.9'], 'ICD-9').age(1, 80),
+]
+
+
+@pytest.fixture(params=[False, True], ids=['in-list', 'temp-table'])
+def resolution(request, monkeypatch):
+    monkeypatch.setattr(config, 'GROUP_KEY_RESOLUTION_ACTIVE', True)
+    monkeypatch.setattr(config, 'MRN_TEMP_TABLE_ACTIVE', request.param)
+
+
+def in_order(df):
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def group_keys_resolved(condition):
+    return any(
+        condition._group_keys.is_cached(condition, dimension)
+        for dimension in condition.dimensions
+    )
+
+
+@pytest.mark.parametrize('condition', CONDITIONS)
+def test_building_queries_does_not_resolve_group_keys(condition, resolution):
+    condition._mrn_statement()
+    estimate = condition._estimate_mrn_count()
+
+    assert not group_keys_resolved(condition)
+    assert estimate == len(condition.get_mrns())
+    assert group_keys_resolved(condition)
+
+
+@pytest.mark.parametrize('condition', CONDITIONS)
+def test_count_and_explain_do_not_resolve_group_keys(condition, resolution):
+    condition.explain()
+    count = condition.count()
+
+    assert not group_keys_resolved(condition)
+    assert count == len(condition.get_mrns())
+
+
+@pytest.mark.parametrize('condition', CONDITIONS)
+def test_resolved_group_keys_select_the_same_data(condition, monkeypatch):
+    monkeypatch.setattr(config, 'GROUP_KEY_RESOLUTION_ACTIVE', False)
+    mrns = condition.get_mrns()
+    data = condition.get_data()
+    fiber.cache.clear()
+
+    monkeypatch.setattr(config, 'GROUP_KEY_RESOLUTION_ACTIVE', True)
+    assert condition.get_mrns() == mrns
+    assert in_order(condition.get_data()).equals(in_order(data))
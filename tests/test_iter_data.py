@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from fiber import Cohort
+from fiber.condition import Diagnosis, LabValue, Procedure
+
+
+def in_order(df):
+    # Chunks may hold different categories, so values are compared
+    df = df.astype(object)
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('condition', [LabValue(), Procedure()])
+def test_chunks_hold_at_most_chunk_size_rows(condition):
+    chunks = list(condition.iter_data(chunk_size=10))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) == 10 for chunk in chunks[:-1])
+    assert 0 < len(chunks[-1]) <= 10
+
+
+@pytest.mark.parametrize('condition', [LabValue(), Procedure()])
+def test_chunks_equal_data(condition):
+    chunks = list(condition.iter_data(chunk_size=10))
+
+    pd.testing.assert_frame_equal(
+        in_order(pd.concat(chunks, ignore_index=True)),
+        in_order(condition.get_data()),
+    )
+
+
+def test_cohort_chunks_equal_cohort_data():
+    cohort = Cohort(Diagnosis('035.%', 'ICD-9'))
+    chunks = list(cohort.iter(LabValue(), chunk_size=5))
+
+    assert all(len(chunk) <= 5 for chunk in chunks)
+    pd.testing.assert_frame_equal(
+        in_order(pd.concat(chunks, ignore_index=True)),
+        in_order(cohort.get(LabValue())),
+    )
@@ -0,0 +1,24 @@
+import fiber.metrics
+from fiber.condition import Diagnosis
+
+
+def test_requests_are_recorded():
+    fiber.metrics.clear()
+    condition = Diagnosis('035.1', 'ICD-9')
+    data = condition.get_data()
+    condition.get_data()
+
+    queries = fiber.metrics.queries()
+    assert queries.cache.tolist() == ['miss', 'hit']
+    assert queries.condition.tolist() == ['Diagnosis', 'Diagnosis']
+    assert queries.method.tolist() == ['get_data', 'get_data']
+    assert queries.rows.tolist() == [len(data), len(data)]
+    assert (queries.bytes > 0).all()
+    assert (queries.total_seconds >= queries.server_seconds).all()
+
+
+def test_clear_removes_queries():
+    Diagnosis('035.1', 'ICD-9').get_data()
+    fiber.metrics.clear()
+
+    assert fiber.metrics.queries().empty
@@ -0,0 +1,33 @@
+import pytest
+
+from fiber import Cohort
+from fiber.condition import Diagnosis, LabValue, Patient, Procedure
+from fiber.config import OCCURRENCE_INDEX
+
+
+def pairs(df):
+    return set(df[OCCURRENCE_INDEX].itertuples(index=False, name=None))
+
+
+@pytest.mark.parametrize('condition', [Diagnosis(), LabValue(), Procedure()])
+def test_occurrences_are_distinct_pairs_of_data(condition):
+    occurrences = condition.get_occurrences()
+
+    assert list(occurrences.columns) == OCCURRENCE_INDEX
+    assert not occurrences.duplicated().any()
+    assert pairs(occurrences) == pairs(condition.get_data())
+
+
+def test_patients_have_no_occurrences():
+    occurrences = Patient().get_occurrences()
+
+    assert list(occurrences.columns) == OCCURRENCE_INDEX
+    assert occurrences.empty
+
+
+def test_cohort_occurrences_of_its_patients():
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+    occurrences = cohort.get_occurrences(LabValue())
+
+    assert set(occurrences.medical_record_number) <= set(cohort.mrns)
+    assert pairs(occurrences) == pairs(cohort.get(LabValue()))
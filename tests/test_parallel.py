@@ -0,0 +1,85 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from fiber import Cohort, config
+from fiber.condition import Diagnosis, LabValue, Patient
+from fiber.database import get_connection
+from fiber.utils import parallel
+
+
+@pytest.fixture
+def thread_pool(monkeypatch):
+    monkeypatch.setattr(config, 'MAX_WORKERS', 4)
+
+
+def test_thread_map_keeps_order(thread_pool):
+    assert parallel.thread_map(lambda item: item * 2, range(10)) == [
+        item * 2 for item in range(10)]
+
+
+def test_nested_thread_map_runs_inline(thread_pool):
+    def inner(item):
+        return parallel.thread_map(
+            lambda _: threading.current_thread().name, range(2))
+
+    names = parallel.thread_map(inner, range(2))
+
+    assert all(name.startswith('fiber') for inner in names for name in inner)
+    assert all(len(set(inner)) == 1 for inner in names)
+
+
+def test_thread_map_raises_in_caller(thread_pool):
+    def fail(item):
+        raise ValueError(item)
+
+    with pytest.raises(ValueError):
+        parallel.thread_map(fail, range(2))
+
+
+def test_pool_threads_release_their_connection(thread_pool):
+    connections = parallel.thread_map(lambda _: get_connection(), range(2))
+
+    assert all(connection.closed for connection in connections)
+
+
+def test_cohort_results_keep_order_of_conditions(thread_pool):
+    cohort = Cohort(Diagnosis('035.1', 'ICD-9'))
+    conditions = [LabValue(), Diagnosis(), Patient()]
+
+    data = cohort.get(*conditions)
+
+    for condition, df in zip(conditions, data):
+        pd.testing.assert_frame_equal(df, condition.get_data(cohort.mrns))
+
+
+@pytest.fixture
+def process_pool(monkeypatch):
+    monkeypatch.setattr(config, 'MAX_PROCESSES', 1)
+    monkeypatch.setattr(config, 'MAX_WORKERS', 2)
+    monkeypatch.setattr(parallel, '_process_executor', None)
+    yield
+    if parallel._process_executor is not None:
+        parallel._process_executor.shutdown()
+
+
+def process_id(_):
+    return os.getpid()
+
+
+def test_process_pool_is_not_forked_from_threads(process_pool):
+    pids = parallel.thread_map(
+        lambda item: parallel.process_call(process_id, item), [1, 2])
+
+    assert pids == [os.getpid()] * 2
+    assert parallel._process_executor is None
+
+
+def test_process_pool_is_used_from_threads_once_started(process_pool):
+    parallel.get_process_executor()
+    pids = parallel.thread_map(
+        lambda item: parallel.process_call(process_id, item), [1, 2])
+
+    assert os.getpid() not in pids
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+
+from fiber import Cohort
+from fiber.condition import Diagnosis
+from fiber.dataframe.pivot import ChunkedPivot, pivot_values
+from fiber.extensions import (
+    BINARY_PIVOT_CONFIG,
+    COUNTED_PIVOT_CONFIG,
+    DEFAULT_PIVOT_CONFIG,
+)
+
+PIVOTS = [
+    pytest.param(
+        condition, kwargs, id=f'{name}-{condition.__class__.__name__}')
+    for name, config in [
+        ('default', DEFAULT_PIVOT_CONFIG),
+        ('binary', BINARY_PIVOT_CONFIG),
+        ('counted', COUNTED_PIVOT_CONFIG),
+    ]
+    for condition, kwargs in config.items()
+]
+
+
+@pytest.fixture(scope='module')
+def cohort():
+    return Cohort(Diagnosis('035.%', 'ICD-9') | Diagnosis('I10', 'ICD-10'))
+
+
+@pytest.mark.parametrize('threshold', [0.0, 0.3, 0.5])
+@pytest.mark.parametrize('partitions', [1, 3, 7])
+@pytest.mark.parametrize('condition, kwargs', PIVOTS)
+def test_partitioned_pivot_equals_pivot(
+    cohort, condition, kwargs, partitions, threshold,
+):
+    kwargs = dict(kwargs, threshold=threshold)
+    expected = cohort.pivot_all_for(condition, **kwargs)
+    result = cohort.pivot_all_for(condition, **kwargs, partitions=partitions)
+
+    pd.testing.assert_frame_equal(
+        result.sort_index(), expected.sort_index())
+
+
+def values(mrns, ages, codes, counts):
+    return pd.DataFrame({
+        'medical_record_number': mrns,
+        'age_in_days': ages,
+        'code': codes,
+        'count': counts,
+    }).set_index(['medical_record_number', 'age_in_days'])
+
+
+@pytest.mark.parametrize('chunks', [
+    # Integer columns, one of them missing in the second chunk
+    [
+        values(['a', 'a'], [1, 2], ['x', 'y'], [1, 2]),
+        values(['b'], [1], ['x'], [3]),
+    ],
+    # Integer and float values of the same column
+    [
+        values(['a'], [1], ['x'], [1]),
+        values(['b', 'b'], [1, 2], ['x', 'x'], [1.5, 2.5]),
+    ],
+    # Fully filled integer column next to one with missing values
+    [
+        values(['a', 'a'], [1, 1], ['x', 'y'], [1, 2]),
+        values(['b'], [1], ['x'], [3]),
+    ],
+])
+def test_chunked_pivot_restores_dtypes(chunks):
+    kwargs = {'columns': ['code'], 'aggfunc': {'count': 'sum'}}
+    pivot = ChunkedPivot(kwargs)
+    for chunk in chunks:
+        pivot.add(chunk)
+
+    expected = pivot_values(pd.concat(chunks), kwargs, threshold=0)
+    pd.testing.assert_frame_equal(
+        pivot.result(threshold=0).sort_index(), expected.sort_index())
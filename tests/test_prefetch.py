@@ -0,0 +1,22 @@
+import pandas as pd
+import pytest
+
+import fiber.cache
+from fiber.condition import Diagnosis, Patient, TobaccoUse
+from fiber.condition.database import prefetch_data
+
+
+@pytest.mark.parametrize('conditions', [
+    [Patient(gender='Female', map_values=True), Patient(gender='Male')],
+    [TobaccoUse(), TobaccoUse(use='No', map_values=False)],
+    [Diagnosis('035.1', 'ICD-9'), Diagnosis('I10', 'ICD-10')],
+])
+def test_prefetched_data_equals_fresh_fetch(conditions):
+    fresh = [condition.get_data() for condition in conditions]
+    fiber.cache.clear()
+
+    prefetch_data(conditions)
+
+    for condition, expected in zip(conditions, fresh):
+        assert condition.get_data.is_cached(condition)
+        pd.testing.assert_frame_equal(condition.get_data(), expected)
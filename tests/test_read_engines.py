@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from fiber import config, database
+from fiber.condition import Diagnosis, LabValue, Patient
+
+
+@pytest.mark.parametrize('condition', [LabValue(), Patient(), Diagnosis()])
+def test_columnar_engine_equals_pandas(condition, monkeypatch):
+    expected = condition._fetch_data()
+    monkeypatch.setattr(config, 'READ_ENGINE', 'columnar')
+    # Buffers grow several times for small fetches
+    monkeypatch.setattr(database, 'READ_CHUNK_SIZE', 7)
+
+    pd.testing.assert_frame_equal(condition._fetch_data(), expected)
+
+
+def test_columnar_engine_returns_empty_result(monkeypatch):
+    monkeypatch.setattr(config, 'READ_ENGINE', 'columnar')
+
+    result = Diagnosis('999.9', 'ICD-9')._fetch_data()
+
+    assert result.empty
+    assert 'medical_record_number' in result.columns
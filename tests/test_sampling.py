@@ -0,0 +1,56 @@
+import pytest
+
+from fiber import Cohort
+from fiber.condition import Diagnosis, MRNs, Patient
+from fiber.database.sampling import partition_mrns, sample_mrns
+
+
+def test_sample_is_selected_on_database():
+    condition = Patient()
+    mrns = condition.get_mrns()
+
+    sampled = condition.get_mrns(sample=0.5, seed=1)
+
+    assert 0 < len(sampled) < len(mrns)
+    assert sampled == sample_mrns(mrns, 0.5, seed=1)
+
+
+def test_samples_are_consistent_across_conditions():
+    patients = Patient().get_mrns(sample=0.5)
+    condition = Diagnosis('035.1', 'ICD-9')
+
+    assert condition.get_mrns(sample=0.5) == condition.get_mrns() & patients
+
+
+def test_sample_of_conditions_without_statement():
+    mrns = sorted(Patient().get_mrns())
+    sampled = MRNs(mrns).get_mrns(sample=0.5, seed=2)
+
+    assert sampled == sample_mrns(mrns, 0.5, seed=2)
+
+
+def test_seeds_select_different_samples():
+    condition = Patient()
+
+    assert condition.get_mrns(sample=0.5) != condition.get_mrns(
+        sample=0.5, seed=1)
+
+
+def test_cohort_sample():
+    cohort = Cohort(Patient(), sample=0.25, seed=3)
+
+    assert cohort.mrns == sample_mrns(Patient().get_mrns(), 0.25, seed=3)
+
+
+@pytest.mark.parametrize('sample', [0, 1.5])
+def test_invalid_sample(sample):
+    with pytest.raises(ValueError):
+        Patient().get_mrns(sample=sample)
+
+
+def test_partitions_are_disjoint():
+    mrns = Patient().get_mrns()
+    parts = partition_mrns(mrns, 4)
+
+    assert set().union(*parts) == mrns
+    assert sum(map(len, parts)) == len(mrns)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+from fiber import Cohort
+from fiber.condition import Diagnosis
+from fiber.dataframe.sparse import SparsePivot
+from fiber.extensions import BINARY_PIVOT_CONFIG, DEFAULT_PIVOT_CONFIG
+
+PIVOTS = [
+    pytest.param(
+        condition, kwargs, id=f'{name}-{condition.__class__.__name__}')
+    for name, config in [
+        ('default', DEFAULT_PIVOT_CONFIG),
+        ('binary', BINARY_PIVOT_CONFIG),
+    ]
+    for condition, kwargs in config.items()
+]
+
+
+def dense(df):
+    return pd.DataFrame(
+        {column: np.asarray(df[column], dtype=float) for column in df},
+        index=df.index,
+    )
+
+
+def test_to_frame_keeps_stored_values():
+    pivot = SparsePivot(
+        sp.csr_matrix(np.array([[1.0, 0.0], [0.0, 2.5], [0.0, 0.0]])),
+        pd.Index(['a', 'b', 'c']),
+        pd.Index(['x', 'y']),
+    )
+    df = pivot.to_frame()
+
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in df.dtypes)
+    pd.testing.assert_frame_equal(
+        dense(df),
+        pd.DataFrame(
+            {'x': [1.0, np.nan, np.nan], 'y': [np.nan, 2.5, np.nan]},
+            index=pivot.index,
+        ),
+    )
+
+
+@pytest.mark.parametrize('condition, kwargs', PIVOTS)
+def test_sparse_frame_equals_pivot(condition, kwargs):
+    cohort = Cohort(Diagnosis('035.%', 'ICD-9') | Diagnosis('I10', 'ICD-10'))
+    expected = cohort.pivot_all_for(condition, **kwargs).astype(float)
+    result = cohort.pivot_all_for(condition, **kwargs, sparse='pandas')
+
+    pd.testing.assert_frame_equal(
+        dense(result).sort_index(), expected.sort_index())